@@ -1,8 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from app.routes.intent_classification import router as intent
+from app.services.intent_model import registry
+from app.services.intent_batcher import batcher, BATCHING_ENABLED
+from app.services.thread_pools import inference_pool, auth_pool
+from app.services.intent_cache import intent_cache
+from app.services.auth_dependency import token_verifier
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load + warm up the classifier once per process, off the event loop
+    await run_in_threadpool(registry.load)
+    if BATCHING_ENABLED:
+        await batcher.start()
+    yield
+    if BATCHING_ENABLED:
+        await batcher.stop()
+    registry.unload()
+    inference_pool.shutdown()
+    auth_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,4 +39,23 @@ app.include_router(intent)
 
 @app.get("/")
 def ping():
-    return {"message": "Babycare backend is running"}
\ No newline at end of file
+    return {"message": "Babycare backend is running"}
+
+
+@app.get("/ready")
+def readiness():
+    # Only report ready once the classifier has been loaded and warmed up
+    if not registry.ready:
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready", "backend": registry.backend}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "inference": inference_pool.stats(),
+        "auth": auth_pool.stats(),
+        "batcher": batcher.stats(),
+        "cache": intent_cache.stats(),
+        "auth_token_cache": token_verifier.stats(),
+    }
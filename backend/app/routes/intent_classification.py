@@ -1,27 +1,91 @@
 # app/routes/intent.py
 
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+import json
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from app.services.auth_dependency import verify_firebase_token
-from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
+from app.services.intent_model import registry
+from app.services.intent_batcher import batcher, BATCHING_ENABLED, BatchQueueFullError
+from app.services.thread_pools import inference_pool, PoolSaturatedError
+from app.services.intent_cache import intent_cache, CACHE_ENABLED
 
 router = APIRouter()
 
+RETRY_AFTER_SECONDS = os.getenv("INTENT_RETRY_AFTER_SECONDS", "1")
+
+# Messages per forward pass for /intent/batch, and the request size ceiling
+BATCH_CHUNK_SIZE = int(os.getenv("INTENT_BATCH_CHUNK_SIZE", "32"))
+BATCH_MAX_MESSAGES = int(os.getenv("INTENT_BATCH_MAX_MESSAGES", "2000"))
+
 class ChatInput(BaseModel):
     message: str
 
+
+class BatchChatInput(BaseModel):
+    messages: List[str]
+    top_k: Optional[int] = Field(default=None, ge=1)  # None = full label distribution
+    stream: bool = False  # NDJSON, one line per message as each chunk finishes
+
+
+def _busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Intent service is busy", headers={"Retry-After": RETRY_AFTER_SECONDS})
+
+
 @router.post("/intent")
 async def intent_classify(input: ChatInput, user = Depends(verify_firebase_token)):
     question = input.message
-    
-    model = AutoModelForSequenceClassification.from_pretrained(
-        "app/models/parenting_roberta_best", local_files_only=True
-    )
-    tokenizer = AutoTokenizer.from_pretrained(
-        "app/models/parenting_roberta_tokenizer", local_files_only=True
-    )
-
-    clf = pipeline("text-classification", model=model, tokenizer=tokenizer)
-
-    intent = clf(question)
-    return {"response": intent}
\ No newline at end of file
+
+    if CACHE_ENABLED:
+        cached = await intent_cache.get(question)
+        if cached is not None:
+            return {"response": cached}
+
+    try:
+        if BATCHING_ENABLED:
+            intent = await batcher.submit(question)
+        else:
+            intent = await inference_pool.run(registry.classify, question)
+    except (BatchQueueFullError, PoolSaturatedError):
+        raise _busy()
+
+    if CACHE_ENABLED:
+        await intent_cache.set(question, intent)
+    return {"response": intent}
+
+
+async def _classify_chunks(messages: List[str], top_k: Optional[int]):
+    for start in range(0, len(messages), BATCH_CHUNK_SIZE):
+        chunk = messages[start:start + BATCH_CHUNK_SIZE]
+        labels = await inference_pool.run(registry.classify_batch, chunk, top_k)
+        for offset, label_scores in enumerate(labels):
+            yield {"index": start + offset, "labels": label_scores}
+
+
+@router.post("/intent/batch")
+async def intent_classify_batch(input: BatchChatInput, user = Depends(verify_firebase_token)):
+    if len(input.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_MESSAGES} messages per request")
+
+    if input.stream:
+        # Admission is checked per chunk; reject up front if the pool is already full
+        if inference_pool.is_saturated():
+            raise _busy()
+
+        async def ndjson():
+            try:
+                async for result in _classify_chunks(input.messages, input.top_k):
+                    yield json.dumps(result) + "\n"
+            except PoolSaturatedError:
+                # Headers are already sent, so report the rejection in-band
+                yield json.dumps({"error": "Intent service is busy"}) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        results = [result async for result in _classify_chunks(input.messages, input.top_k)]
+    except PoolSaturatedError:
+        raise _busy()
+    return {"results": results}
@@ -1,6 +1,12 @@
 from app import firebase_config  # ensures SDK is initialized
 from fastapi import Depends, HTTPException, Request
 from firebase_admin import auth
+from app.services.thread_pools import auth_pool, PoolSaturatedError
+from childapp_shared.token_cache import verifier_from_env
+
+# verify_id_token is blocking (may fetch Google certs), so it runs on the auth
+# pool; repeat tokens are served from an in-process cache until shortly before exp
+token_verifier = verifier_from_env(auth.verify_id_token, run_blocking=auth_pool.run)
 
 async def verify_firebase_token(request: Request):
     auth_header = request.headers.get("Authorization")
@@ -10,10 +16,12 @@ async def verify_firebase_token(request: Request):
     id_token = auth_header.split(" ")[1]
 
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = await token_verifier(id_token)
         return {
             "uid": decoded_token["uid"],
             "email": decoded_token.get("email", "unknown"),
         }
+    except PoolSaturatedError:
+        raise HTTPException(status_code=503, detail="Auth service is busy", headers={"Retry-After": "1"})
     except Exception:
         raise HTTPException(status_code=401, detail="Token verification failed")
\ No newline at end of file
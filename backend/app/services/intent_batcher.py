@@ -0,0 +1,152 @@
+# app/services/intent_batcher.py
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Any, Optional, Awaitable
+from app.services.intent_model import registry
+from app.services.thread_pools import inference_pool
+
+
+class BatchQueueFullError(Exception):
+    """Raised when the batching queue is at capacity."""
+
+
+class IntentBatcher:
+    """
+    Dynamic micro-batching for the intent classifier.
+
+    Concurrent callers enqueue their message and await a future. A single
+    collector task drains the queue into batches of up to `max_batch_size`
+    items, waiting at most `max_wait_ms` after the first item arrives, and
+    runs each batch in a worker thread so the event loop stays free.
+
+    `run_blocking` lets the caller supply the thread pool used for the forward
+    pass (e.g. the service-wide bounded pool); by default a private
+    single-thread executor is used.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[str]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 256,
+        run_blocking: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+        self._executor = None
+        if run_blocking is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intent-batch")
+            run_blocking = self._run_in_executor
+        self.run_blocking = run_blocking
+
+        # Simple counters for observability
+        self.batches_run = 0
+        self.items_processed = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        # Fail anything still waiting so callers don't hang
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Intent batcher stopped"))
+
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    async def _run_in_executor(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "batches_run": self.batches_run,
+            "items_processed": self.items_processed,
+        }
+
+    async def submit(self, message: str):
+        if self._queue is None:
+            raise RuntimeError("Intent batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((message, future))
+        except asyncio.QueueFull:
+            raise BatchQueueFullError("Intent batch queue is full")
+        return await future
+
+    async def _collect_batch(self):
+        # Block until at least one item is available, then fill up until the
+        # batch is full or the wait window closes.
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+
+            # Skip callers that already gave up (e.g. client disconnected)
+            batch = [(msg, fut) for msg, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+
+            messages = [msg for msg, _ in batch]
+            try:
+                results = await self.run_blocking(self.predict_batch, messages)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.items_processed += len(batch)
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+
+def batcher_from_env(predict_batch: Callable[[List[str]], List[Any]], run_blocking=None) -> IntentBatcher:
+    return IntentBatcher(
+        predict_batch,
+        max_batch_size=int(os.getenv("INTENT_BATCH_MAX_SIZE", "16")),
+        max_wait_ms=float(os.getenv("INTENT_BATCH_MAX_WAIT_MS", "5")),
+        max_queue_size=int(os.getenv("INTENT_BATCH_QUEUE_SIZE", "256")),
+        run_blocking=run_blocking,
+    )
+
+
+# Process-wide batcher shared by the /intent routes
+
+BATCHING_ENABLED = os.getenv("INTENT_BATCHING", "true").lower() == "true"
+batcher = batcher_from_env(registry.classify_batch, run_blocking=inference_pool.run)
@@ -0,0 +1,170 @@
+# app/services/intent_cache.py
+import json
+import os
+import re
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Folds case, punctuation and whitespace so near-identical messages share a key."""
+    text = unicodedata.normalize("NFKC", message).casefold()
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class SharedCacheBackend(ABC):
+    """
+    Interface for a cache shared between replicas. Values are JSON-serialisable.
+    Implementations must never raise on a miss; they return None instead.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        ...
+
+
+class InMemorySharedCache(SharedCacheBackend):
+    """Local stand-in for a shared cache, used for tests and single-replica runs."""
+
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return json.loads(payload)
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        self._data[key] = (time.monotonic() + ttl_seconds, json.dumps(value))
+
+
+class RedisSharedCache(SharedCacheBackend):
+    """Shared cache on Redis. Requires the optional `redis` package."""
+
+    def __init__(self, url: str, prefix: str = "intent:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            payload = await self._redis.get(self._prefix + key)
+        except Exception as e:
+            print(f"[intent_cache] Shared cache get failed: {e}")
+            return None
+        return json.loads(payload) if payload else None
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        try:
+            await self._redis.set(self._prefix + key, json.dumps(value), ex=max(1, int(ttl_seconds)))
+        except Exception as e:
+            print(f"[intent_cache] Shared cache set failed: {e}")
+
+
+class IntentCache:
+    """
+    Bounded LRU + TTL cache of intent predictions keyed on the normalized
+    message, with an optional shared tier consulted on local misses.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 3600,
+                 shared: Optional[SharedCacheBackend] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get_local(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, message: str) -> Optional[Any]:
+        key = normalize_message(message)
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared is not None:
+            value = await self.shared.get(key)
+            if value is not None:
+                self.shared_hits += 1
+                self._set_local(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, message: str, value: Any) -> None:
+        key = normalize_message(message)
+        self._set_local(key, value)
+        if self.shared is not None:
+            await self.shared.set(key, value, self.ttl_seconds)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
+
+
+def _shared_backend_from_env() -> Optional[SharedCacheBackend]:
+    backend = os.getenv("INTENT_CACHE_SHARED", "").lower()
+    if backend == "redis":
+        return RedisSharedCache(os.environ["INTENT_CACHE_REDIS_URL"])
+    if backend == "memory":
+        return InMemorySharedCache()
+    return None
+
+
+CACHE_ENABLED = os.getenv("INTENT_CACHE", "true").lower() == "true"
+
+intent_cache = IntentCache(
+    max_size=int(os.getenv("INTENT_CACHE_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("INTENT_CACHE_TTL_SECONDS", "3600")),
+    shared=_shared_backend_from_env(),
+)
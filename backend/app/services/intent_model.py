@@ -0,0 +1,123 @@
+# app/services/intent_model.py
+import os
+from typing import List, Dict, Optional
+import numpy as np
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+MODEL_DIR = "app/models/parenting_roberta_best"
+TOKENIZER_DIR = "app/models/parenting_roberta_tokenizer"
+
+# Produced by notebook/export_onnx.py (model + tokenizer + config)
+ONNX_DIR = "app/models/parenting_roberta_onnx"
+ONNX_MODEL_FILE = "model.int8.onnx"
+
+# Inference runtime: "torch" (full precision) or "onnx" (int8 quantized)
+INTENT_BACKEND = os.getenv("INTENT_BACKEND", "torch").lower()
+
+WARMUP_MESSAGE = "My baby has had a fever since last night, what should I do?"
+
+
+class IntentModelRegistry:
+    """
+    Holds the intent classifier for the lifetime of the process.
+    Loaded once at startup so requests never touch the weights on disk.
+    Both backends return the same shape as the transformers
+    text-classification pipeline: [{"label": ..., "score": ...}].
+    """
+
+    def __init__(self, backend: str = INTENT_BACKEND):
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown intent backend: {backend}")
+        self.backend = backend
+        self.model = None
+        self.session = None
+        self.tokenizer = None
+        self.id2label = None
+        self.ready = False
+
+    def load(self):
+        print(f"[intent_model] Loading parenting_roberta classifier ({self.backend})...")
+        if self.backend == "onnx":
+            self._load_onnx()
+        else:
+            self._load_torch()
+
+        # Warm-up inference so the first real request doesn't pay for lazy init
+        self._predict([WARMUP_MESSAGE])
+        self.ready = True
+        print("[intent_model] Classifier loaded and warmed up")
+
+    def _load_torch(self):
+        self.model = AutoModelForSequenceClassification.from_pretrained(
+            MODEL_DIR, local_files_only=True
+        )
+        self.model.eval()
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            TOKENIZER_DIR, local_files_only=True
+        )
+        self.id2label = self.model.config.id2label
+
+    def _load_onnx(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            os.path.join(ONNX_DIR, ONNX_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(ONNX_DIR, local_files_only=True)
+        self.id2label = AutoConfig.from_pretrained(ONNX_DIR, local_files_only=True).id2label
+
+    def unload(self):
+        self.ready = False
+        self.model = None
+        self.session = None
+        self.tokenizer = None
+
+    def _logits(self, messages: List[str]) -> np.ndarray:
+        if self.backend == "onnx":
+            inputs = self.tokenizer(messages, padding=True, truncation=True, return_tensors="np")
+            feed = {
+                "input_ids": inputs["input_ids"].astype(np.int64),
+                "attention_mask": inputs["attention_mask"].astype(np.int64),
+            }
+            return self.session.run(["logits"], feed)[0]
+
+        import torch
+
+        inputs = self.tokenizer(messages, padding=True, truncation=True, return_tensors="pt")
+        with torch.inference_mode():
+            return self.model(**inputs).logits.numpy()
+
+    def _predict(self, messages: List[str], top_k: Optional[int] = 1) -> List[List[Dict]]:
+        logits = self._logits(messages)
+        # Numerically stable softmax
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = exp / exp.sum(axis=-1, keepdims=True)
+
+        # top_k=None returns the full label distribution
+        k = probs.shape[-1] if top_k is None else min(top_k, probs.shape[-1])
+        ranked = np.argsort(-probs, axis=-1)[:, :k]
+
+        return [
+            [{"label": self.id2label[int(idx)], "score": float(row[idx])} for idx in order]
+            for row, order in zip(probs, ranked)
+        ]
+
+    def classify(self, message: str):
+        return self.classify_batch([message])[0]
+
+    def classify_batch(self, messages: List[str], top_k: Optional[int] = 1) -> List[List[Dict]]:
+        """
+        Tokenizes the messages together (padded to the longest one) and runs a
+        single forward pass. Each entry has the same shape as classify(), with
+        up to `top_k` labels sorted by score.
+        """
+        if not self.ready:
+            raise RuntimeError("Intent classifier is not loaded yet")
+        return self._predict(messages, top_k)
+
+
+registry = IntentModelRegistry()
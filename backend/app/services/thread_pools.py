@@ -0,0 +1,90 @@
+# app/services/thread_pools.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already has its maximum number of running + queued jobs."""
+
+
+class BoundedThreadPool:
+    """
+    Runs blocking calls on a fixed-size thread pool with admission control.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may
+    wait for a thread; anything beyond that is rejected immediately so the
+    caller can answer with a fast 503 instead of piling up.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def _call(self, fn: Callable, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def is_saturated(self) -> bool:
+        return self.in_flight + self.queued >= self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self.is_saturated():
+                self.rejected += 1
+                raise PoolSaturatedError(f"{self.name} pool is saturated")
+            self.queued += 1
+
+        future = self.executor.submit(self._call, fn, args, kwargs)
+        future.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_cancelled(self, future):
+        # A job cancelled before it got a thread (caller went away) never runs _call
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "completed": self.completed,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+inference_pool = BoundedThreadPool(
+    "inference",
+    max_workers=int(os.getenv("INFERENCE_POOL_SIZE", str(os.cpu_count() or 1))),
+    max_queue=int(os.getenv("INFERENCE_QUEUE_LIMIT", "64")),
+)
+
+auth_pool = BoundedThreadPool(
+    "auth",
+    max_workers=int(os.getenv("AUTH_POOL_SIZE", "4")),
+    max_queue=int(os.getenv("AUTH_QUEUE_LIMIT", "128")),
+)
@@ -0,0 +1,123 @@
+# Auth overhead per request with and without the ID token cache.
+# Tokens are Firebase-shaped RS256 JWTs signed with a locally generated key
+# and verified through google.oauth2.id_token.verify_token, the same call
+# firebase_admin makes, with the signing certs served from memory (so the
+# uncached numbers are a lower bound: no cert fetch is ever needed).
+#   cd backend && PYTHONPATH=. python notebook/bench_auth_cache.py --requests 2000 --users 20
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+from google.oauth2 import id_token
+
+from childapp_shared.token_cache import CachedTokenVerifier, TokenCache
+
+PROJECT_ID = "bench-project"
+KEY_ID = "bench-key"
+CERTS_URL = "https://example.invalid/certs"
+
+
+def make_key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def make_token(signer, uid: str) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "auth_time": now,
+        "iat": now,
+        "exp": now + 3600,
+        "sub": uid,
+        "uid": uid,
+        "email": f"{uid}@example.com",
+    }
+    return jwt.encode(signer, payload, header={"kid": KEY_ID}).decode()
+
+
+class CertsResponse:
+    status = 200
+
+    def __init__(self, certs):
+        self.data = json.dumps(certs).encode()
+
+
+def make_verify(cert_pem: str):
+    response = CertsResponse({KEY_ID: cert_pem})
+
+    def request(url, method="GET", **kwargs):
+        return response
+
+    def verify(token: str) -> dict:
+        return id_token.verify_token(token, request, audience=PROJECT_ID, certs_url=CERTS_URL)
+
+    return verify
+
+
+async def run(verifier, tokens, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(token):
+        async with semaphore:
+            start = time.perf_counter()
+            await verifier(token)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(t) for t in tokens))
+    return time.perf_counter() - start, latencies
+
+
+def report(name, elapsed, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(f"{name:<12}{len(latencies) / elapsed:>10.0f}{statistics.mean(latencies) * 1e6:>12.0f}"
+          f"{statistics.median(latencies) * 1e6:>11.0f}{p99 * 1e6:>11.0f}")
+
+
+async def main(args):
+    key_pem, cert_pem = make_key_and_cert()
+    signer = crypt.RSASigner.from_string(key_pem, key_id=KEY_ID)
+    verify = make_verify(cert_pem)
+
+    users = [make_token(signer, f"user{i}") for i in range(args.users)]
+    tokens = [users[i % args.users] for i in range(args.requests)]
+    assert verify(tokens[0])["uid"] == "user0"
+
+    print(f"{args.requests} requests, {args.users} distinct tokens, concurrency {args.concurrency}")
+    print(f"{'mode':<12}{'req/s':>10}{'mean us':>12}{'p50 us':>11}{'p99 us':>11}")
+
+    elapsed, latencies = await run(CachedTokenVerifier(verify), tokens, args.concurrency)
+    report("no cache", elapsed, latencies)
+
+    cache = TokenCache()
+    elapsed, latencies = await run(CachedTokenVerifier(verify, cache), tokens, args.concurrency)
+    report("cache", elapsed, latencies)
+    print(f"\ncache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
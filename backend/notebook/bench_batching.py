@@ -0,0 +1,84 @@
+# Compares per-request inference against the micro-batching engine.
+# Run from the backend/ directory (model files must be in app/models):
+#   PYTHONPATH=. python notebook/bench_batching.py --requests 256
+import argparse
+import asyncio
+import statistics
+import time
+
+from starlette.concurrency import run_in_threadpool
+from app.services.intent_model import registry
+from app.services.intent_batcher import IntentBatcher
+
+MESSAGES = [
+    "My baby has a fever of 101, should I be worried?",
+    "How many hours should a 6 month old sleep?",
+    "My toddler keeps throwing tantrums at bedtime",
+    "Is it normal for a newborn to sneeze a lot?",
+    "When should I start solid foods?",
+    "My son has a rash on his arms after daycare",
+    "How do I handle sibling jealousy?",
+    "baby has been vomiting since this morning",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def run_clients(classify, concurrency: int, total: int):
+    latencies = []
+    counter = iter(range(total))
+
+    async def client():
+        for i in counter:
+            start = time.perf_counter()
+            await classify(MESSAGES[i % len(MESSAGES)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "throughput": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+async def main(args):
+    registry.load()
+
+    async def per_request(message):
+        return await run_in_threadpool(registry.classify, message)
+
+    print(f"{'mode':<12}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for concurrency in args.concurrency:
+        result = await run_clients(per_request, concurrency, args.requests)
+        print(f"{'per-request':<12}{concurrency:>8}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+        batcher = IntentBatcher(
+            registry.classify_batch,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms,
+            max_queue_size=max(args.requests, 256),
+        )
+        await batcher.start()
+        result = await run_clients(batcher.submit, concurrency, args.requests)
+        avg_batch = batcher.items_processed / max(1, batcher.batches_run)
+        await batcher.stop()
+        print(f"{'batched':<12}{concurrency:>8}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+              f"   (avg batch {avg_batch:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+# Exports parenting_roberta_best to ONNX and applies dynamic int8 quantization.
+# Needs the `onnx` package on top of the service requirements:
+#   pip install -r notebook/requirements.txt
+# Run from the backend/ directory after the model has been downloaded:
+#   PYTHONPATH=. python notebook/export_onnx.py
+# Then start the service with INTENT_BACKEND=onnx.
+import os
+
+import torch
+from onnxruntime.quantization import quantize_dynamic, QuantType
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from app.services.intent_model import MODEL_DIR, TOKENIZER_DIR, ONNX_DIR, ONNX_MODEL_FILE
+
+FP32_MODEL_FILE = "model.fp32.onnx"
+
+
+def export():
+    os.makedirs(ONNX_DIR, exist_ok=True)
+
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_DIR, local_files_only=True)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_DIR, local_files_only=True)
+
+    # Tokenizer and config travel with the ONNX graph so the runtime only needs ONNX_DIR
+    tokenizer.save_pretrained(ONNX_DIR)
+    model.config.save_pretrained(ONNX_DIR)
+
+    sample = tokenizer(["My baby has a fever", "How much should a toddler sleep?"],
+                       padding=True, return_tensors="pt")
+    fp32_path = os.path.join(ONNX_DIR, FP32_MODEL_FILE)
+
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+        )
+    print(f"[export_onnx] Wrote {fp32_path}")
+
+    int8_path = os.path.join(ONNX_DIR, ONNX_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    size_mb = os.path.getsize(int8_path) / 1024 / 1024
+    print(f"[export_onnx] Wrote {int8_path} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    export()
@@ -0,0 +1,94 @@
+# Accuracy parity + latency/RSS comparison between the torch and onnx backends.
+# Run from the backend/ directory with a held-out JSONL file where each line is
+# {"question": "...", "label": "..."}:
+#   PYTHONPATH=. python notebook/onnx_parity.py --data heldout.jsonl
+#
+# Each backend runs in its own subprocess so peak RSS is measured in isolation.
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run_backend(backend: str, data_path: str, batch_size: int):
+    """Worker mode: load one backend, classify the held-out set, print JSON stats."""
+    from app.services.intent_model import IntentModelRegistry
+
+    with open(data_path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    registry = IntentModelRegistry(backend=backend)
+    registry.load()
+    load_s = time.perf_counter() - start
+
+    predictions, latencies = [], []
+    for row in rows:
+        t0 = time.perf_counter()
+        predictions.append(registry.classify(row["question"])[0]["label"])
+        latencies.append(time.perf_counter() - t0)
+
+    batch_start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        registry.classify_batch([r["question"] for r in rows[i:i + batch_size]])
+    batch_s = time.perf_counter() - batch_start
+
+    correct = sum(p == r["label"] for p, r in zip(predictions, rows))
+    # ru_maxrss is reported in KiB on Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(json.dumps({
+        "backend": backend,
+        "predictions": predictions,
+        "accuracy": correct / len(rows),
+        "load_s": load_s,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "batch_throughput": len(rows) / batch_s,
+        "peak_rss_mb": rss_mb,
+    }))
+
+
+def main(args):
+    results = {}
+    for backend in ("torch", "onnx"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--data", args.data,
+             "--batch-size", str(args.batch_size)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        # The last line is the JSON report; earlier lines are load logs
+        results[backend] = json.loads(out.strip().splitlines()[-1])
+
+    torch_res, onnx_res = results["torch"], results["onnx"]
+    agreement = sum(
+        a == b for a, b in zip(torch_res["predictions"], onnx_res["predictions"])
+    ) / len(torch_res["predictions"])
+
+    print(f"{'backend':<8}{'accuracy':>10}{'load s':>9}{'p50 ms':>9}{'p99 ms':>9}{'batch/s':>10}{'RSS MB':>9}")
+    for r in (torch_res, onnx_res):
+        print(f"{r['backend']:<8}{r['accuracy']:>10.4f}{r['load_s']:>9.2f}{r['p50_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['batch_throughput']:>10.1f}{r['peak_rss_mb']:>9.0f}")
+    print(f"Label agreement torch vs onnx: {agreement:.4f}")
+    print(f"Accuracy delta (onnx - torch): {onnx_res['accuracy'] - torch_res['accuracy']:+.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--worker", choices=["torch", "onnx"])
+    args = parser.parse_args()
+
+    if args.worker:
+        run_backend(args.worker, args.data, args.batch_size)
+    else:
+        main(args)
@@ -1,10 +1,29 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.routes.save_chat import router as save_chat_router
 from app.routes.chat_history import router as chat_history
 from app.routes.child_insights import router as child_insights
+from app.services.db_connection import db_pool, PoolTimeoutError
+from app.services.chat_writer import chat_writer, WriteQueueFullError
+from app.services.auth_dependency import token_verifier
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pool per process, opened before the first request and closed on shutdown
+    await db_pool.start()
+    if chat_writer is not None:
+        chat_writer.start()
+    yield
+    # Flush queued chat rows while the pool is still open
+    if chat_writer is not None:
+        await chat_writer.stop()
+    await db_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +38,25 @@ app.include_router(chat_history)
 app.include_router(child_insights) 
 
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(status_code=503, content={"detail": "Database is busy"}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(WriteQueueFullError)
+async def write_queue_full_handler(request: Request, exc: WriteQueueFullError):
+    return JSONResponse(status_code=503, content={"detail": "Chat write queue is full"}, headers={"Retry-After": "1"})
+
+
 @app.get("/")
 def ping():
-    return {"message": "Babycare backend is running"}
\ No newline at end of file
+    return {"message": "Babycare backend is running"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "db_pool": db_pool.stats(),
+        "auth_token_cache": token_verifier.stats(),
+        "chat_writer": chat_writer.stats() if chat_writer is not None else {"enabled": False},
+    }
@@ -1,13 +1,17 @@
 # app/routes/save_chat.py
+import os
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from datetime import datetime
-from app.services.db_connection import getconn
+from app.services.db_connection import db_pool, parse_timestamp, PoolTimeoutError
+from app.services.chat_writer import chat_writer, insert_chat_rows, ChatRow
 from app.services.auth_dependency import verify_firebase_token
 from typing import Dict, Any, List
 
 router = APIRouter()
 
+BATCH_MAX_MESSAGES = int(os.getenv("SAVE_CHAT_BATCH_MAX_MESSAGES", "500"))
+
 class SaveChatInput(BaseModel):
     question: str
     intent: str
@@ -15,42 +19,48 @@ class SaveChatInput(BaseModel):
     response: str
     timestamp: str  # ISO 8601
 
-@router.post("/save-chat")
-async def save_chat(input: SaveChatInput, user = Depends(verify_firebase_token)):
-    uid = user["uid"]
+class SaveChatBatchInput(BaseModel):
+    messages: List[SaveChatInput]
+
+
+def _to_row(uid: str, input: SaveChatInput) -> ChatRow:
+    try:
+        timestamp = parse_timestamp(input.timestamp)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="timestamp must be ISO 8601")
+    return (uid, input.question, input.intent, input.parsed_symptom, input.response, timestamp)
+
+
+async def _write(rows: List[ChatRow]):
+    # Write-behind: acknowledge once queued (a full queue is answered with 503 by the app's handler)
+    if chat_writer is not None:
+        chat_writer.submit(rows)
+        return JSONResponse(status_code=202, content={"status": "queued", "count": len(rows)})
 
-    # 3. Connect to Cloud SQL and insert
+    # Otherwise insert on a pooled connection (asyncpg autocommits outside a transaction)
     try:
-        conn = getconn()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO chat_history_detailed (uid, question, intent, parsed_symptom, response, timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            uid,
-            input.question,
-            input.intent,
-            input.parsed_symptom,
-            input.response,
-            input.timestamp,
-        ))
-
-        conn.commit()
-    
+        async with db_pool.acquire() as conn:
+            await insert_chat_rows(conn, rows)
+    except PoolTimeoutError:
+        raise  # answered with 503 by the app's handler
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB insert failed: {e}")
-    finally:
-        if cursor:
-            try:
-                cursor.close()
-            except:
-                pass
-        if conn:
-            try:
-                if conn.closed == 0:
-                    conn.close()
-            except:
-                pass
-
-    return {"status": "success"}
\ No newline at end of file
+
+    return {"status": "success", "count": len(rows)}
+
+
+@router.post("/save-chat")
+async def save_chat(input: SaveChatInput, user = Depends(verify_firebase_token)):
+    return await _write([_to_row(user["uid"], input)])
+
+
+@router.post("/save-chat/batch")
+async def save_chat_batch(input: SaveChatBatchInput, user = Depends(verify_firebase_token)):
+    if len(input.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_MESSAGES} messages per batch")
+    if not input.messages:
+        return {"status": "success", "count": 0}
+
+    # All rows are validated before any is written or queued
+    uid = user["uid"]
+    return await _write([_to_row(uid, message) for message in input.messages])
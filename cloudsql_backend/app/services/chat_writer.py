@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.db_connection import DatabasePool, db_pool
+
+logger = logging.getLogger(__name__)
+
+# (uid, question, intent, parsed_symptom, response, timestamp)
+ChatRow = Tuple[str, str, str, Dict[str, Any], str, datetime]
+
+CHAT_COLUMNS = ["uid", "question", "intent", "parsed_symptom", "response", "timestamp"]
+
+# One statement, one round trip, however many rows
+INSERT_ROWS = """
+    INSERT INTO chat_history_detailed (uid, question, intent, parsed_symptom, response, timestamp)
+    SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::jsonb[], $5::text[], $6::timestamptz[])
+"""
+
+
+async def insert_chat_rows(conn, rows: Sequence[ChatRow]):
+    """Multi-row insert of chat_history_detailed rows."""
+    await conn.execute(INSERT_ROWS, *(list(column) for column in zip(*rows)))
+
+
+class WriteQueueFullError(Exception):
+    """Raised when the write-behind queue has no room for the rows."""
+
+
+class ChatWriteBehind:
+    """
+    Write-behind ingestion for /save-chat.
+
+    Rows are acknowledged once they are on a bounded in-process queue. A
+    background flusher writes them in batches: a batch goes out when it
+    reaches `batch_size` rows or `flush_interval` seconds after its first
+    row, whichever comes first. "insert" batches are one multi-row INSERT,
+    "copy" batches use COPY. A failed batch is retried with backoff and
+    dropped (and logged) after `max_retries`. stop() drains the queue for
+    up to `drain_timeout` seconds; rows not written by then are counted as
+    dropped, so a database outage can't hang shutdown.
+
+    Rows still queued when the process dies are lost; that is the trade-off
+    for not waiting on the database.
+    """
+
+    def __init__(self, pool: DatabasePool, max_queue: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 0.2, method: str = "insert", max_retries: int = 3,
+                 drain_timeout: float = 10.0):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.method = method
+        self.max_retries = max_retries
+        self.drain_timeout = drain_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._copy_column_types: Optional[Dict[str, str]] = None
+
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.retries = 0
+
+    def submit(self, rows: Sequence[ChatRow]):
+        """Queues all rows or none of them."""
+        if self.queue.maxsize - self.queue.qsize() < len(rows):
+            self.rejected += len(rows)
+            raise WriteQueueFullError(f"Write queue is full ({self.queue.qsize()} rows pending)")
+        for row in rows:
+            self.queue.put_nowait(row)
+        self.accepted += len(rows)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flushes what is still queued within `drain_timeout`, then stops the flusher."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+        # Queued rows plus the batch the cancelled flusher was writing
+        lost = self.accepted - self.written - self.dropped
+        if lost:
+            self.dropped += lost
+            logger.error("Chat write queue not drained within %.1fs, dropping %d rows", self.drain_timeout, lost)
+
+    async def _next_batch(self) -> List[ChatRow]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write_with_retries(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write_with_retries(self, batch: List[ChatRow]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.write(batch)
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.dropped += len(batch)
+                    logger.error("Dropping %d chat rows after %d attempts: %s", len(batch), attempt + 1, e)
+                    return
+                self.retries += 1
+                logger.warning("Chat batch write failed (attempt %d), retrying: %s", attempt + 1, e)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+    async def write(self, rows: Sequence[ChatRow]):
+        async with self.pool.acquire() as conn:
+            if self.method == "copy":
+                await self._copy(conn, rows)
+            else:
+                await insert_chat_rows(conn, rows)
+
+    async def _copy(self, conn, rows: Sequence[ChatRow]):
+        # COPY can't cast, so shape values for the actual column types
+        if self._copy_column_types is None:
+            records = await conn.fetch(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = 'chat_history_detailed'"
+            )
+            self._copy_column_types = {r["column_name"]: r["data_type"] for r in records}
+        naive_ts = self._copy_column_types.get("timestamp") == "timestamp without time zone"
+        json_col = self._copy_column_types.get("parsed_symptom") in ("json", "jsonb")
+
+        def shape(row: ChatRow):
+            uid, question, intent, parsed, response, ts = row
+            if naive_ts:
+                ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+            return uid, question, intent, parsed if json_col else json.dumps(parsed), response, ts
+
+        await conn.copy_records_to_table("chat_history_detailed", records=[shape(r) for r in rows], columns=CHAT_COLUMNS)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "method": self.method,
+            "pending": self.queue.qsize(),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "retries": self.retries,
+            "avg_batch_rows": round(self.written / self.batches, 1) if self.batches else 0.0,
+        }
+
+
+def write_behind_from_env(pool: DatabasePool) -> Optional[ChatWriteBehind]:
+    if os.getenv("SAVE_CHAT_WRITE_BEHIND", "false").lower() != "true":
+        return None
+    return ChatWriteBehind(
+        pool,
+        max_queue=int(os.getenv("SAVE_CHAT_QUEUE_SIZE", "10000")),
+        batch_size=int(os.getenv("SAVE_CHAT_BATCH_SIZE", "200")),
+        flush_interval=float(os.getenv("SAVE_CHAT_FLUSH_INTERVAL_MS", "200")) / 1000,
+        method=os.getenv("SAVE_CHAT_WRITE_METHOD", "insert").lower(),
+        drain_timeout=float(os.getenv("SAVE_CHAT_DRAIN_TIMEOUT_SECONDS", "10")),
+    )
+
+
+# None unless SAVE_CHAT_WRITE_BEHIND=true; started and drained by the app lifespan
+chat_writer = write_behind_from_env(db_pool)
@@ -1,47 +1,218 @@
-import os
-import psycopg2
-from google.cloud.sql.connector import Connector
+import asyncio
 import json
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Optional
+
+import asyncpg
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection frees up within the acquire timeout."""
 
-# Create connector instance
-connector = Connector()
 
-def getconn() -> psycopg2.extensions.connection:
-    
+def _load_db_config() -> dict:
     # ✅ Read the JSON string from environment variable (injected via --update-secrets)
     db_config_str = os.environ.get("DB_CONFIG")
     if not db_config_str:
         raise RuntimeError("DB_CONFIG env var not found")
 
     try:
-        db_config = json.loads(db_config_str)
+        return json.loads(db_config_str)
     except Exception as e:
         raise RuntimeError(f"Invalid DB_CONFIG format: {e}")
 
-    # Extract values
-    db_name = db_config["DB_NAME"]
-    instance_name = db_config["INSTANCE_CONNECTION_NAME"]
-    # db_user= db_config["DB_USER"]
-
-    db_user = db_config["DB_USER"]  # e.g. "backend-access-all@axial-trail-460618-u6.iam"
-    db_password = db_config["DB_PASSWORD"] 
-    # Connect using IAM auth
-    # conn = connector.connect(
-    #     instance_name,
-    #     "pg8000",  # or psycopg2
-    #     db=db_name,
-    #     user=db_user,
-    #     enable_iam_auth=True
-    # )
-
-    conn = connector.connect(
-    instance_name,
-    driver="pg8000",
-    db=db_name,
-    user=db_user,
-    password=db_password,
-    ip_type="PRIVATE",  # 👈 required for private IP
-    enable_iam_auth=False  # Disable IAM auth
-    )
-
-    return conn
\ No newline at end of file
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO 8601 -> datetime; accepts the trailing "Z" the frontend sends (Python 3.10 doesn't)."""
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _encode_jsonb(value) -> bytes:
+    return b"\x01" + json.dumps(value).encode()  # binary jsonb is a version byte + the JSON text
+
+
+def _decode_jsonb(data: bytes):
+    return json.loads(data[1:])
+
+
+async def _init_connection(conn):
+    # dicts in and out of json/jsonb columns, like pg8000 did. Binary codecs,
+    # because COPY (write-behind "copy" method) only speaks the binary format.
+    await conn.set_type_codec("json", encoder=lambda v: json.dumps(v).encode(), decoder=json.loads,
+                              schema="pg_catalog", format="binary")
+    await conn.set_type_codec("jsonb", encoder=_encode_jsonb, decoder=_decode_jsonb,
+                              schema="pg_catalog", format="binary")
+
+
+class DatabasePool:
+    """
+    asyncpg connection pool, created once at app startup.
+
+    Connects to Cloud SQL through the async Cloud SQL connector (DB_CONFIG),
+    or to a plain Postgres when DATABASE_URL is set (local runs, benchmarks).
+    On acquire, connections older than `max_lifetime` are recycled and
+    connections idle longer than `health_check_after` are pinged first, so a
+    connection dropped by the server is replaced instead of failing a query.
+    """
+
+    def __init__(self, min_size: int = 1, max_size: int = 10, max_lifetime: float = 1800,
+                 max_idle: float = 300, health_check_after: float = 30, acquire_timeout: float = 5,
+                 command_timeout: float = 30):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.command_timeout = command_timeout
+
+        self.pool: Optional[asyncpg.Pool] = None
+        self._connector = None
+        # Keyed by backend pid: when the connection was opened / last released
+        self._opened_at: Dict[int, float] = {}
+        self._released_at: Dict[int, float] = {}
+
+        self.acquired = 0
+        self.acquire_timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.recycled = 0
+        self.health_checks = 0
+        self.health_check_failures = 0
+
+    async def _init(self, conn):
+        await _init_connection(conn)
+        pid = conn.get_server_pid()
+        self._opened_at[pid] = time.monotonic()
+        conn.add_termination_listener(lambda _conn: self._forget(pid))
+
+    def _forget(self, pid: int):
+        self._opened_at.pop(pid, None)
+        self._released_at.pop(pid, None)
+
+    async def start(self):
+        options = dict(
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=self.max_idle,
+            command_timeout=self.command_timeout,
+            init=self._init,
+        )
+        dsn = os.getenv("DATABASE_URL")
+        if dsn:
+            self.pool = await asyncpg.create_pool(dsn, **options)
+            return
+
+        from google.cloud.sql.connector import create_async_connector
+
+        db_config = _load_db_config()
+        self._connector = await create_async_connector()
+
+        async def connect(*args, **kwargs):
+            return await self._connector.connect_async(
+                db_config["INSTANCE_CONNECTION_NAME"],
+                "asyncpg",
+                db=db_config["DB_NAME"],
+                user=db_config["DB_USER"],
+                password=db_config["DB_PASSWORD"],
+                ip_type="PRIVATE",  # 👈 required for private IP
+                enable_iam_auth=False,
+            )
+
+        self.pool = await asyncpg.create_pool(connect=connect, **options)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+        if self._connector is not None:
+            await self._connector.close_async()
+
+    async def _checkout(self, deadline: float):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            conn = await self.pool.acquire(timeout=remaining)
+            pid = conn.get_server_pid()
+            now = time.monotonic()
+
+            if now - self._opened_at.get(pid, now) > self.max_lifetime:
+                self.recycled += 1
+                await self._discard(conn, pid)
+                continue
+
+            if now - self._released_at.get(pid, now) > self.health_check_after:
+                self.health_checks += 1
+                try:
+                    await conn.fetchval("SELECT 1", timeout=min(remaining, 2))
+                except Exception:
+                    self.health_check_failures += 1
+                    await self._discard(conn, pid)
+                    continue
+                except BaseException:
+                    # Cancelled mid-ping: the connection's state is unknown,
+                    # so hand it back terminated rather than leak it
+                    await asyncio.shield(self._discard(conn, pid))
+                    raise
+            return conn
+
+    async def _discard(self, conn, pid: int):
+        # A terminated connection is replaced by the pool on the next acquire
+        self._forget(pid)
+        conn.terminate()
+        await self.pool.release(conn)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        if self.pool is None:
+            raise RuntimeError("Database pool is not started")
+        started = time.monotonic()
+        try:
+            conn = await self._checkout(started + self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            raise PoolTimeoutError(f"No database connection available within {self.acquire_timeout}s")
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        pid = conn.get_server_pid()
+        try:
+            yield conn
+        finally:
+            self._released_at[pid] = time.monotonic()
+            await self.pool.release(conn)
+
+    def stats(self) -> dict:
+        started = self.pool is not None
+        return {
+            "size": self.pool.get_size() if started else 0,
+            "idle": self.pool.get_idle_size() if started else 0,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "acquired": self.acquired,
+            "acquire_timeouts": self.acquire_timeouts,
+            "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.acquired, 2) if self.acquired else 0.0,
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 2),
+            "recycled": self.recycled,
+            "health_checks": self.health_checks,
+            "health_check_failures": self.health_check_failures,
+        }
+
+
+db_pool = DatabasePool(
+    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800")),
+    max_idle=float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300")),
+    health_check_after=float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER_SECONDS", "30")),
+    acquire_timeout=float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_SECONDS", "5")),
+    command_timeout=float(os.getenv("DB_COMMAND_TIMEOUT_SECONDS", "30")),
+)
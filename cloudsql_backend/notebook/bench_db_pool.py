@@ -0,0 +1,90 @@
+# Per-request latency of the /save-chat + /history queries with a fresh
+# connection per request (the old getconn() pattern) vs the shared pool.
+# Needs a plain Postgres with notebook/local_schema.sql applied:
+#   cd cloudsql_backend && DATABASE_URL=postgresql://postgres@127.0.0.1:5433/postgres \
+#       PYTHONPATH=. python notebook/bench_db_pool.py --requests 500 --concurrency 20
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+import asyncpg
+
+from app.services.db_connection import DatabasePool, _init_connection
+
+INSERT = """
+    INSERT INTO chat_history_detailed (uid, question, intent, parsed_symptom, response, timestamp)
+    VALUES ($1, $2, $3, $4::jsonb, $5, $6::timestamptz)
+"""
+HISTORY = """
+    SELECT question, response, timestamp FROM chat_history_detailed
+    WHERE uid = $1 ORDER BY timestamp DESC LIMIT 5
+"""
+
+
+async def request(conn, i: int):
+    uid = f"bench-user-{i % 50}"
+    await conn.execute(INSERT, uid, "my baby has a fever", "medical",
+                       {"primary_symptom": "fever", "age": "2"}, "Keep her hydrated.",
+                       datetime.now(timezone.utc))
+    await conn.fetch(HISTORY, uid)
+
+
+async def per_request_connection(dsn: str, i: int):
+    conn = await asyncpg.connect(dsn)
+    try:
+        await _init_connection(conn)
+        await request(conn, i)
+    finally:
+        await conn.close()
+
+
+async def run(name, handler, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(f"{name:<16}{requests / elapsed:>9.0f}{statistics.median(latencies) * 1000:>10.2f}{p99 * 1000:>10.2f}")
+
+
+async def main(args):
+    dsn = os.environ["DATABASE_URL"]
+    print(f"{args.requests} requests (insert + history query), concurrency {args.concurrency}")
+    print(f"{'mode':<16}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}")
+
+    await run("connect/request", lambda i: per_request_connection(dsn, i), args.requests, args.concurrency)
+
+    pool = DatabasePool(min_size=args.pool_size, max_size=args.pool_size)
+    await pool.start()
+
+    async def pooled(i):
+        async with pool.acquire() as conn:
+            await request(conn, i)
+
+    await run(f"pool ({args.pool_size})", pooled, args.requests, args.concurrency)
+    print(f"\npool: {pool.stats()}")
+    await pool.close()
+
+    conn = await asyncpg.connect(dsn)
+    await conn.execute("DELETE FROM chat_history_detailed WHERE uid LIKE 'bench-user-%'")
+    await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
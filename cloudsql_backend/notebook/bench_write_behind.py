@@ -0,0 +1,100 @@
+# chat_history_detailed ingestion throughput (rows/s) at different batch sizes:
+#   - per-row INSERT (what a synchronous /save-chat does for each message)
+#   - multi-row INSERT ... SELECT unnest(...) and COPY, the two write-behind methods
+#   - the full write-behind pipeline: concurrent producers submit single rows,
+#     the flusher batches them; reports ack latency and rows/s until drained
+# Needs a plain Postgres with notebook/local_schema.sql applied:
+#   cd cloudsql_backend && DATABASE_URL=postgresql://postgres@127.0.0.1:5433/postgres \
+#       PYTHONPATH=. python notebook/bench_write_behind.py --rows 20000
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+
+from app.services.chat_writer import ChatWriteBehind, insert_chat_rows
+from app.services.db_connection import DatabasePool
+
+INSERT_ONE = """
+    INSERT INTO chat_history_detailed (uid, question, intent, parsed_symptom, response, timestamp)
+    VALUES ($1, $2, $3, $4::jsonb, $5, $6::timestamptz)
+"""
+BENCH_UID_PREFIX = "bench-wb-"
+
+
+def make_rows(n: int):
+    now = datetime.now(timezone.utc)
+    return [(f"{BENCH_UID_PREFIX}{i % 50}", "my baby has a fever", "medical",
+             {"primary_symptom": "fever", "age": "2"}, "Keep her hydrated.", now) for i in range(n)]
+
+
+async def write_direct(pool: DatabasePool, writer: ChatWriteBehind, method: str, rows, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        if method == "row":
+            async with pool.acquire() as conn:
+                for row in batch:
+                    await conn.execute(INSERT_ONE, *row)
+        elif method == "insert":
+            async with pool.acquire() as conn:
+                await insert_chat_rows(conn, batch)
+        else:
+            await writer.write(batch)
+    return len(rows) / (time.perf_counter() - start)
+
+
+async def write_behind(pool: DatabasePool, rows, batch_size: int, method: str, producers: int):
+    writer = ChatWriteBehind(pool, max_queue=len(rows), batch_size=batch_size, flush_interval=0.05, method=method)
+    writer.start()
+    acks = []
+
+    async def produce(chunk):
+        for row in chunk:
+            t = time.perf_counter()
+            writer.submit([row])
+            acks.append(time.perf_counter() - t)
+            await asyncio.sleep(0)  # let the other producers and the flusher run
+
+    start = time.perf_counter()
+    await asyncio.gather(*(produce(rows[p::producers]) for p in range(producers)))
+    await writer.stop()
+    elapsed = time.perf_counter() - start
+    return len(rows) / elapsed, statistics.median(acks) * 1e6, writer.stats()
+
+
+async def main(args):
+    pool = DatabasePool(min_size=1, max_size=4)
+    await pool.start()
+    rows = make_rows(args.rows)
+    sizes = [int(s) for s in args.batch_sizes.split(",")]
+    copier = ChatWriteBehind(pool, method="copy")
+
+    print(f"{args.rows} rows per run (per-row INSERT capped at {args.row_cap})\n")
+    print("direct writes, rows/s")
+    print(f"{'batch':>7}{'row INSERT':>13}{'multi INSERT':>15}{'COPY':>10}")
+    for size in sizes:
+        per_row = await write_direct(pool, copier, "row", rows[:args.row_cap], size)
+        multi = await write_direct(pool, copier, "insert", rows, size)
+        copy = await write_direct(pool, copier, "copy", rows, size)
+        print(f"{size:>7}{per_row:>13.0f}{multi:>15.0f}{copy:>10.0f}")
+
+    print(f"\nwrite-behind pipeline, {args.producers} producers submitting one row each")
+    print(f"{'batch':>7}{'method':>8}{'rows/s':>10}{'ack p50 us':>12}{'avg batch':>11}")
+    for method in ("insert", "copy"):
+        for size in sizes:
+            rate, ack_us, stats = await write_behind(pool, rows, size, method, args.producers)
+            print(f"{size:>7}{method:>8}{rate:>10.0f}{ack_us:>12.1f}{stats['avg_batch_rows']:>11}")
+
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM chat_history_detailed WHERE uid LIKE $1", BENCH_UID_PREFIX + "%")
+    await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--row-cap", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="1,10,50,200,1000")
+    parser.add_argument("--producers", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,27 @@
+-- Approximation of the Cloud SQL tables the service uses, for local runs and
+-- benchmarks against a plain Postgres:
+--   psql "$DATABASE_URL" -f notebook/local_schema.sql
+CREATE TABLE IF NOT EXISTS chat_history_detailed (
+    id SERIAL PRIMARY KEY,
+    uid TEXT NOT NULL,
+    question TEXT,
+    intent TEXT,
+    parsed_symptom JSONB,
+    response TEXT,
+    timestamp TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS chat_history_detailed_uid_ts ON chat_history_detailed (uid, timestamp DESC);
+
+CREATE TABLE IF NOT EXISTS child_symptom_timeline (
+    id SERIAL PRIMARY KEY,
+    uid TEXT NOT NULL,
+    timestamp TIMESTAMP,
+    intent TEXT,
+    symptom TEXT,
+    age TEXT,
+    severity TEXT,
+    duration TEXT,
+    associated_symptoms TEXT[],
+    summary TEXT
+);
@@ -0,0 +1,255 @@
+# Local OpenAI-compatible stand-in for load tests and benchmarks.
+#   python loadtest/openai_stub.py --port 9100 --latency-scale 1.0 --error-rate 0.01
+# Point a service at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+#
+# Serves POST /v1/chat/completions (plain, tool-call and streaming) with
+# canned answers for every prompt the peditrician and psychologist services
+# send, lognormal latency per model, and optional 429/500 injection.
+# GET /_stub/stats returns per-stage call counts, latency and token totals.
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# (median ms to first byte, lognormal sigma, ms per completion token)
+LATENCY_PROFILES = {
+    "gpt-4.1-2025-04-14": (500, 0.35, 12),
+    "gpt-3.5-turbo-0125": (250, 0.30, 6),
+}
+DEFAULT_PROFILE = (300, 0.3, 8)
+
+SYMPTOMS = ["fever", "rash", "cough", "vomiting", "diarrhea", "ear pain", "sore throat"]
+
+CONFIG = {"latency_scale": 1.0, "error_rate": 0.0, "ready_after_turns": 2}
+STATS = defaultdict(lambda: {"calls": 0, "errors": 0, "latency_ms": [], "prompt_tokens": 0, "completion_tokens": 0})
+
+app = FastAPI()
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _parse_symptoms(message: str) -> dict:
+    text = message.lower()
+    parsed = {}
+    symptom = next((s for s in SYMPTOMS if s in text or s.rstrip("e") + "ing" in text), None)
+    if symptom:
+        parsed["primary_symptom"] = symptom
+    elif "not well" not in text and "off" not in text:
+        parsed["primary_symptom"] = text.split()[-1] if text.split() else ""
+    if m := re.search(r"(\d+ (?:days?|weeks?|hours?)|since yesterday)", text):
+        parsed["duration"] = m.group(1)
+    if m := re.search(r"(\d+ (?:years?|months?)) old", text):
+        parsed["age"] = m.group(1)
+    return parsed
+
+
+def _json_after(prompt: str, marker: str):
+    """Decodes the JSON value that follows `marker` in a prompt."""
+    start = prompt.index(marker) + len(marker)
+    return json.JSONDecoder().raw_decode(prompt[start:].lstrip())[0]
+
+
+def _classify(body: dict):
+    """Returns (stage, content, tool_arguments) for a chat.completions request."""
+    messages = body.get("messages", [])
+    prompt = messages[-1]["content"] if messages else ""
+    tools = body.get("tools") or []
+    tool_name = tools[0]["function"]["name"] if tools else None
+
+    if tool_name == "symptom_triage":
+        parsed = _parse_symptoms(prompt)
+        parsed["is_valid_primary_symptom"] = bool(parsed.get("primary_symptom")) and parsed["primary_symptom"] in SYMPTOMS
+        parsed["extra_required_fields"] = ["temperature reading"] if parsed.get("primary_symptom") == "fever" else ["onset"]
+        return "extract_and_validate", None, parsed
+
+    if tool_name == "symptom_parser" and "previously extracted structured symptom object" in prompt:
+        existing = _json_after(prompt, "structured symptom object:")
+        answer = re.search(r'The parent has now said: "(.*)"', prompt).group(1)
+        merged = dict(existing)
+        for field, schema in tools[0]["function"]["parameters"]["properties"].items():
+            if not merged.get(field):
+                if schema.get("type") == "array":
+                    merged[field] = ["none"] if re.search(r"\bno\b|none", answer.lower()) else [answer]
+                else:
+                    merged[field] = answer
+                break
+        return "merge_update", None, merged
+
+    if tool_name == "symptom_parser":
+        return "parse_symptom", None, _parse_symptoms(prompt)
+
+    if "was extracted as a primary symptom" in prompt:
+        symptom = re.search(r'The term "(.*?)"', prompt).group(1)
+        return "validate_symptom", "yes" if symptom in SYMPTOMS else "no", None
+
+    if "additional** clinically relevant" in prompt:
+        return "required_fields", '["temperature reading", "hydration status"]', None
+
+    if "For the following missing fields" in prompt:
+        fields = _json_after(prompt, "missing fields:")
+        return "followups", json.dumps({f: f"Could you tell me more about the {f}?" for f in fields}), None
+
+    if "do you have enough information" in prompt:
+        # Ready once the parent has answered enough follow-ups
+        user_turns = prompt.count('"role": "user"') + 1
+        ready = user_turns >= CONFIG["ready_after_turns"]
+        reply = {"ready_to_answer": ready,
+                 "followup_question": None if ready else "How long has this behaviour been going on?"}
+        return "check_completeness", json.dumps(reply), None
+
+    if "child psychologist" in prompt:
+        return "psychological_guidance", _guidance_text("psychological"), None
+
+    if "summar" in prompt.lower():
+        return "summary", "Parent is worried about their child's behaviour; details discussed so far.", None
+
+    return "guidance", _guidance_text("pediatric"), None
+
+
+def _guidance_text(kind: str) -> str:
+    return (
+        f"Thank you for sharing these details. Here is some {kind} guidance. "
+        "1. What to do now: keep your child comfortable, offer fluids often and let them rest. "
+        "2. What to monitor: watch for changes in energy, breathing, feeding and sleep. "
+        "3. When to seek help: contact your pediatrician or urgent care if symptoms worsen, "
+        "last more than a few days, or if you are worried at any point."
+    )
+
+
+async def _sleep_first_byte(model: str):
+    median, sigma, _ = LATENCY_PROFILES.get(model, DEFAULT_PROFILE)
+    await asyncio.sleep(random.lognormvariate(0, sigma) * median / 1000 * CONFIG["latency_scale"])
+
+
+def _per_token_delay(model: str) -> float:
+    return LATENCY_PROFILES.get(model, DEFAULT_PROFILE)[2] / 1000 * CONFIG["latency_scale"]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    started = time.perf_counter()
+    body = await request.json()
+    model = body.get("model", "stub")
+    stage, content, arguments = _classify(body)
+    stats = STATS[stage]
+    stats["calls"] += 1
+
+    if random.random() < CONFIG["error_rate"]:
+        stats["errors"] += 1
+        status = random.choice([429, 500, 503])
+        return JSONResponse(status_code=status, headers={"retry-after": "0"},
+                            content={"error": {"message": "injected failure", "type": "server_error"}})
+
+    await _sleep_first_byte(model)
+
+    text = content if content is not None else json.dumps(arguments)
+    prompt_tokens = _tokens(json.dumps(body.get("messages", [])) + json.dumps(body.get("tools", [])))
+    completion_tokens = _tokens(text)
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens}
+
+    if body.get("stream"):
+        async def events():
+            words = re.findall(r"\S+\s*", text)
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word} if i else {"role": "assistant", "content": word},
+                                 "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(_per_token_delay(model) * max(1, _tokens(word)))
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(final)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                # Like the real API: one extra chunk with no choices, only usage
+                usage_chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                               "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["latency_ms"].append((time.perf_counter() - started) * 1000)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(_per_token_delay(model) * completion_tokens)
+
+    message = {"role": "assistant", "content": content}
+    finish_reason = "stop"
+    if arguments is not None:
+        message = {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+            "function": {"name": body["tools"][0]["function"]["name"], "arguments": text},
+        }]}
+        finish_reason = "tool_calls"
+
+    stats["latency_ms"].append((time.perf_counter() - started) * 1000)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@app.get("/_stub/stats")
+def stub_stats():
+    return {
+        stage: {
+            "calls": s["calls"],
+            "errors": s["errors"],
+            "p50_ms": round(_percentile(s["latency_ms"], 50), 1),
+            "p95_ms": round(_percentile(s["latency_ms"], 95), 1),
+            "prompt_tokens": s["prompt_tokens"],
+            "completion_tokens": s["completion_tokens"],
+        }
+        for stage, s in STATS.items()
+    }
+
+
+@app.post("/_stub/reset")
+def stub_reset():
+    STATS.clear()
+    return {"status": "reset"}
+
+
+@app.post("/_stub/config")
+async def stub_config(request: Request):
+    CONFIG.update(await request.json())
+    return CONFIG
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply all modelled latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 429/5xx")
+    parser.add_argument("--ready-after-turns", type=int, default=2, help="Psychologist turns before guidance")
+    args = parser.parse_args()
+    CONFIG.update(latency_scale=args.latency_scale, error_rate=args.error_rate,
+                  ready_after_turns=args.ready_after_turns)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
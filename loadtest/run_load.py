@@ -0,0 +1,235 @@
+# End-to-end load test for the peditrician and psychologist services against
+# the local OpenAI stub. With --spawn it starts the stub and both services:
+#   python loadtest/run_load.py --spawn --conversations 200 --concurrency 20
+#
+# Drives realistic multi-turn conversations:
+#   - /pediatrician then /pediatrician/update until the triage is complete
+#     (use_session + session-id bodies by default, --legacy-update for
+#     full-state bodies)
+#   - /ws/child-psychologist until a "complete" frame arrives
+#     (full-history frames by default, --ws-protocol delta for delta frames)
+# and reports throughput, p50/p95/p99 per endpoint and the stub's per-stage
+# LLM breakdown.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import websockets
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+OPENING_MESSAGES = [
+    "My 2 year old has had a fever since yesterday",
+    "my baby has a rash on her arms",
+    "My son has been vomiting since this morning, he is 4 years old",
+    "she has a cough",
+    "my daughter has ear pain for 2 days",
+    "my child is not well",
+]
+
+FIELD_ANSWERS = {
+    "primary_symptom": "She has a fever",
+    "duration": "3 days",
+    "age": "2 years old",
+    "severity": "moderate",
+    "associated_symptoms": "no other symptoms",
+    "temperature reading": "102F",
+}
+
+PSYCHOLOGIST_MESSAGES = [
+    "My 6 year old has been having tantrums every evening",
+    "It started about a month ago after his sister was born",
+    "He also struggles to fall asleep",
+    "School says he is fine there",
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, seconds: float):
+        self.latencies[name].append(seconds * 1000)
+
+    def report(self, elapsed: float, conversations: int):
+        total_requests = sum(len(v) for v in self.latencies.values())
+        print(f"\nConversations: {conversations} in {elapsed:.1f}s "
+              f"({conversations / elapsed:.2f} conv/s, {total_requests / elapsed:.2f} req/s)")
+        print(f"{'endpoint':<32}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(name, [])
+            print(f"{name:<32}{len(values):>7}{percentile(values, 50):>9.0f}{percentile(values, 95):>9.0f}"
+                  f"{percentile(values, 99):>9.0f}{self.errors.get(name, 0):>8}")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def pediatrician_conversation(http: httpx.AsyncClient, base_url: str, uid: str,
+                                    recorder: Recorder, legacy: bool, max_turns: int = 8):
+    headers = {"Authorization": f"Bearer test-{uid}"}
+
+    start = time.perf_counter()
+    opening = {"message": random.choice(OPENING_MESSAGES), "use_session": not legacy}
+    res = await http.post(f"{base_url}/pediatrician", json=opening, headers=headers)
+    recorder.record("POST /pediatrician", time.perf_counter() - start)
+    res.raise_for_status()
+    state = res.json()
+
+    for _ in range(max_turns):
+        if state["status"] == "complete":
+            return
+        missing = state.get("missing_fields") or ["primary_symptom"]
+        answer = FIELD_ANSWERS.get(missing[0], "I'm not sure, maybe a little")
+
+        full_state = {
+            "primary_symptom_available": state["primary_symptom_available"],
+            "new_message": answer,
+            "existing_symptom": state["parsed_symptom"],
+            "required_fields": state["required_fields"],
+            "followups": state["followup_questions"],
+        }
+        body = full_state if legacy else {"session_id": state["session_id"], "new_message": answer}
+
+        start = time.perf_counter()
+        res = await http.post(f"{base_url}/pediatrician/update", json=body, headers=headers)
+        if res.status_code == 404 and not legacy:
+            # Session lives on another instance (or expired): resend the full state
+            res = await http.post(f"{base_url}/pediatrician/update",
+                                  json={**full_state, "session_id": state["session_id"]}, headers=headers)
+        recorder.record("POST /pediatrician/update", time.perf_counter() - start)
+        res.raise_for_status()
+        state = res.json()
+
+
+async def psychologist_conversation(ws_url: str, uid: str, recorder: Recorder, protocol: str = "legacy"):
+    subprotocols = ["delta.v1"] if protocol == "delta" else None
+    async with websockets.connect(f"{ws_url}/ws/child-psychologist?token=test-{uid}", subprotocols=subprotocols) as ws:
+        history = []
+        for message in PSYCHOLOGIST_MESSAGES:
+            start = time.perf_counter()
+            await ws.send(json.dumps({"message": message, "last_seq": len(history)}))
+            history.append({"role": "user", "content": message})
+            # Skip streamed partial frames; a turn ends on complete/incomplete
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame.get("status") in ("complete", "incomplete", "error"):
+                    break
+            recorder.record("WS child-psychologist turn", time.perf_counter() - start)
+            if frame["status"] == "error":
+                raise RuntimeError(frame.get("message"))
+            if "history" in frame:
+                history = frame["history"]
+            elif frame.get("message"):
+                history.append(frame["message"])
+            if protocol == "delta" and frame.get("seq") != len(history):
+                raise RuntimeError(f"delta seq {frame.get('seq')} != local history {len(history)}")
+            if frame["status"] == "complete":
+                return
+
+
+async def run(args):
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(timeout=120, limits=limits) as http:
+        await http.post(f"{args.stub_url}/_stub/reset")
+
+        async def one(i: int):
+            uid = f"user{i}"
+            async with semaphore:
+                kind = "pediatrician" if (args.mix == "pediatrician" or
+                                          (args.mix == "both" and i % 2 == 0)) else "psychologist"
+                try:
+                    if kind == "pediatrician":
+                        await pediatrician_conversation(http, args.pediatrician_url, uid, recorder, args.legacy_update)
+                    else:
+                        ws_url = args.psychologist_url.replace("http", "ws", 1)
+                        await psychologist_conversation(ws_url, uid, recorder, args.ws_protocol)
+                except Exception as e:
+                    recorder.errors[kind] += 1
+                    if args.verbose:
+                        print(f"[{kind}] {uid} failed: {e!r}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.conversations)))
+        elapsed = time.perf_counter() - start
+
+        recorder.report(elapsed, args.conversations)
+
+        stages = (await http.get(f"{args.stub_url}/_stub/stats")).json()
+        print(f"\n{'LLM stage (stub side)':<32}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}{'prompt tok':>12}{'compl tok':>11}{'errors':>8}")
+        for stage, s in sorted(stages.items()):
+            print(f"{stage:<32}{s['calls']:>7}{s['p50_ms']:>9.0f}{s['p95_ms']:>9.0f}"
+                  f"{s['prompt_tokens']:>12}{s['completion_tokens']:>11}{s['errors']:>8}")
+
+        for name, url in (("pediatrician", args.pediatrician_url), ("psychologist", args.psychologist_url)):
+            try:
+                metrics = await http.get(f"{url}/metrics")
+                if metrics.status_code == 200 and args.verbose:
+                    print(f"\n{name} /metrics:\n{metrics.text}")
+            except httpx.HTTPError:
+                pass
+
+
+def spawn(args):
+    log = open(os.path.join(HERE, "loadtest_services.log"), "w")
+    stub_port = args.stub_url.rsplit(":", 1)[1]
+    procs = [subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "openai_stub.py"), "--port", stub_port,
+         "--latency-scale", str(args.latency_scale), "--error-rate", str(args.error_rate)],
+        stdout=log, stderr=subprocess.STDOUT)]
+    for service, url in (("peditrician", args.pediatrician_url), ("psychologist", args.psychologist_url)):
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "serve_local.py"), service,
+             "--port", url.rsplit(":", 1)[1], "--openai-base-url", f"{args.stub_url}/v1"],
+            stdout=log, stderr=subprocess.STDOUT))
+
+    deadline = time.time() + 60
+    for url in (args.stub_url + "/_stub/stats", args.pediatrician_url + "/", args.psychologist_url + "/"):
+        while True:
+            try:
+                httpx.get(url, timeout=1)
+                break
+            except httpx.HTTPError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"{url} did not come up; see loadtest/loadtest_services.log")
+                time.sleep(0.3)
+    return procs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mix", choices=["both", "pediatrician", "psychologist"], default="both")
+    parser.add_argument("--legacy-update", action="store_true", help="Send full triage state on /pediatrician/update")
+    parser.add_argument("--ws-protocol", choices=["legacy", "delta"], default="legacy")
+    parser.add_argument("--stub-url", default="http://127.0.0.1:9100")
+    parser.add_argument("--pediatrician-url", default="http://127.0.0.1:9101")
+    parser.add_argument("--psychologist-url", default="http://127.0.0.1:9102")
+    parser.add_argument("--spawn", action="store_true", help="Start the stub and both services locally")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    procs = spawn(args) if args.spawn else []
+    try:
+        asyncio.run(run(args))
+    finally:
+        for proc in procs:
+            proc.terminate()
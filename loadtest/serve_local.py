@@ -0,0 +1,66 @@
+# Runs the peditrician or psychologist service locally for load tests, with
+# Firebase verification replaced by a local test verifier and OpenAI pointed
+# at the stub server:
+#   python loadtest/serve_local.py peditrician --port 9101 --openai-base-url http://127.0.0.1:9100/v1
+#
+# The test verifier accepts "test-<uid>" tokens (Authorization header or
+# ?token= for WebSockets) and nothing else. It is only installed here; the
+# services themselves always verify with Firebase.
+import argparse
+import os
+import sys
+
+import uvicorn
+from fastapi import HTTPException, Request, WebSocket
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_TOKEN_PREFIX = "test-"
+
+
+def verify_test_token(token: str) -> dict:
+    if not token or not token.startswith(TEST_TOKEN_PREFIX):
+        raise HTTPException(status_code=401, detail="Token verification failed")
+    uid = token[len(TEST_TOKEN_PREFIX):]
+    return {"uid": uid, "email": f"{uid}@loadtest.local"}
+
+
+def build_app(service: str):
+    # Each service is its own "app" package, so import it from its directory
+    service_dir = os.path.join(REPO_ROOT, service)
+    os.chdir(service_dir)
+    sys.path.insert(0, service_dir)
+    # childapp_shared, without requiring `pip install -e shared`
+    sys.path.insert(1, os.path.join(REPO_ROOT, "shared"))
+
+    from app.main import app
+    from app.services import auth_dependency
+
+    async def verify_firebase_token(request: Request):
+        header = request.headers.get("Authorization", "")
+        return verify_test_token(header[len("Bearer "):] if header.startswith("Bearer ") else "")
+
+    app.dependency_overrides[auth_dependency.verify_firebase_token] = verify_firebase_token
+
+    if service == "psychologist":
+        from app.routes import psychologist_route
+
+        async def verify_firebase_token_wss(websocket: WebSocket):
+            return verify_test_token(websocket.query_params.get("token"))
+
+        psychologist_route.verify_firebase_token_wss = verify_firebase_token_wss
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("service", choices=["peditrician", "psychologist"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--openai-base-url", default="http://127.0.0.1:9100/v1")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_BASE_URL"] = args.openai_base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest")
+
+    uvicorn.run(build_app(args.service), host=args.host, port=args.port, log_level="warning")
@@ -1,8 +1,44 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.routes.telehealth import router as telehealth_router
+from app.services.peditrician_telehealth import (
+    client as llm_client, required_fields_cache, followup_store, COMMON_SYMPTOMS,
+    parse_flight, extract_flight, required_fields_flight,
+)
+from app.services.session_store import session_store
+from app.services.triage_pipeline import EXTRACTION_MODE
+from app.services.auth_dependency import token_verifier
+from app.services.speculative_guidance import speculation
+from app.services import fast_merge
+from childapp_shared.llm_metrics import metrics as llm_metrics, render_gauges
+
+# LOG_LEVEL=DEBUG brings back the full request/response dumps
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+# httpx logs every OpenAI request at INFO; the "llm" logger already samples them
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the required-fields cache in the background so common first turns
+    # skip a gpt-4.1 call without delaying container startup. Only the multi
+    # extraction mode reads it; single mode gets the extra fields from its
+    # combined call (and fills the cache lazily if it falls back to multi).
+    preload = None
+    if EXTRACTION_MODE == "multi" and os.getenv("REQUIRED_FIELDS_PRELOAD", "true").lower() == "true":
+        preload = asyncio.create_task(required_fields_cache.preload(COMMON_SYMPTOMS))
+    yield
+    if preload and not preload.done():
+        preload.cancel()
+    await llm_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,4 +52,27 @@ app.include_router(telehealth_router)
 
 @app.get("/")
 def ping():
-    return {"message": "Peditrician backend is running"}
\ No newline at end of file
+    return {"message": "Peditrician backend is running"}
+
+
+def _component_stats() -> dict:
+    return {
+        "required_fields_cache": required_fields_cache.stats(),
+        "followup_store": followup_store.stats(),
+        "session_store": session_store.stats(),
+        "fast_merge": fast_merge.stats.as_dict(),
+        "llm_client": llm_client.stats(),
+        "auth_token_cache": token_verifier.stats(),
+        "speculative_guidance": speculation.stats() if speculation else {"enabled": False},
+        **{f"single_flight_{f.name}": f.stats() for f in (parse_flight, extract_flight, required_fields_flight)},
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    return _component_stats()
+
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return llm_metrics.render_prometheus() + render_gauges("peditrician", _component_stats())
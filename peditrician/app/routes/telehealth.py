@@ -1,183 +1,232 @@
-from fastapi import APIRouter, Depends
+import json
+import logging
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.services.peditrician_telehealth import (
-    parse_symptom_with_llm,
     generate_guidance_with_llm,
+    stream_guidance_with_llm,
     merge_symptom_update,
-    get_required_fields_from_llm,
-    generate_followup_questions_with_llm,
-    is_primary_symptom_valid
 )
+from app.services.triage_pipeline import run_first_turn
+from app.services.session_store import session_store, new_session_id
+from app.services.speculative_guidance import speculation
 from app.services.auth_dependency import verify_firebase_token
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-BASE_REQUIRED_FIELDS = ["primary_symptom", "duration", "age", "severity", "associated_symptoms"]
+FIRST_TURN_LABELS = {"invalid": "Zero", "incomplete": "First", "complete": "Second"}
+RESTART_LABELS = {"invalid": "Fifth", "incomplete": "Sixth", "complete": "Seventh"}
 
 class UserInput(BaseModel):
     message: str
+    # Clients that will send the returned session_id back opt in to sessions;
+    # without it nothing is stored server-side (legacy clients echo the state)
+    use_session: bool = False
 
 
 class FollowupInput(BaseModel):
-    primary_symptom_available: bool
     new_message: str
-    existing_symptom: Dict[str, Any]
-    required_fields: List[str]
-    followups: Dict[str, Any]
+    # New clients send only the session id returned by the previous turn...
+    session_id: Optional[str] = None
+    # ...older clients echo the whole triage state back instead
+    primary_symptom_available: Optional[bool] = None
+    existing_symptom: Dict[str, Any] = {}
+    required_fields: List[str] = []
+    followups: Dict[str, Any] = {}
+
+
+async def _resolve_followup(input: FollowupInput, uid: str) -> FollowupInput:
+    """
+    Fills the triage state from the session store when a session id is given.
+    The in-memory store is per instance, so a session can be missing on
+    another replica (or after a restart): the client then resends the full
+    triage state from its last payload, with or without the session id.
+    """
+    if input.session_id is None:
+        if input.primary_symptom_available is None:
+            raise HTTPException(status_code=422, detail="Either session_id or the full triage state is required")
+        return input
+
+    state = await session_store.get(uid, input.session_id)
+    if state is None:
+        if input.primary_symptom_available is not None:
+            logger.info('Triage session %s not found, using the state sent by the client', input.session_id)
+            return input
+        raise HTTPException(status_code=404, detail="Triage session not found or expired; resend the full triage state")
+
+    return FollowupInput(new_message=input.new_message, session_id=input.session_id, **state)
+
+
+async def _remember(uid: str, session_id: str, final_json: Dict[str, Any], previous_followups: Dict[str, Any],
+                    use_session: bool):
+    """
+    For clients that opted in to sessions, stores the state the next turn
+    needs and tags the payload with its session id. With speculation on, a
+    turn missing only optional fields also starts drafting the guidance;
+    only session clients can collect a draft, so nobody else gets one.
+    """
+    if not use_session:
+        return
+
+    if final_json["status"] == "complete":
+        await session_store.delete(uid, session_id)
+        return
+
+    if speculation:
+        speculation.observe(uid, session_id, final_json)
+
+    await session_store.save(uid, session_id, {
+        "primary_symptom_available": final_json["primary_symptom_available"],
+        "existing_symptom": final_json["parsed_symptom"],
+        "required_fields": final_json["required_fields"],
+        # Keep every question asked so far; the payload only lists missing ones
+        "followups": {**previous_followups, **final_json["followup_questions"]},
+    })
+    final_json["session_id"] = session_id
+
+
+async def _first_turn(message: str, labels: Dict[str, str]) -> Dict[str, Any]:
+    """Returns the turn payload; a "complete" payload has no guidance yet."""
+    final_json, timings = await run_first_turn(message)
+    logger.info('First turn stage timings (ms): %s', timings)
+
+    if final_json["status"] == "incomplete":
+        label = labels["incomplete"] if final_json["primary_symptom_available"] else labels["invalid"]
+        logger.debug('%s: %s', label, final_json)
+    return final_json
+
+
+async def _update_turn(input: FollowupInput) -> Dict[str, Any]:
+    """Returns the turn payload; a "complete" payload has no guidance yet."""
+    logger.debug('Input from frontEnd: %s', input)
+
+    if not input.primary_symptom_available:
+        return await _first_turn(input.new_message, RESTART_LABELS)
+
+    required_fields = input.required_fields
+    logger.debug('Required Field Peditrician Update EndPoint, Returned by FrontEnd: %s', required_fields)
+
+    # Step 1: Merge new message into structured symptom
+    updated = await merge_symptom_update(input.existing_symptom, input.new_message, input.required_fields)
+
+    logger.debug('Updated strctured symptoms, backend update (First): %s', updated)
+
+    # Step 2: Identify missing fields
+    missing_fields = [f for f in required_fields if not updated.get(f)]
+
+    logger.debug('Missing Fields, backend update (First): %s', missing_fields)
+
+    if missing_fields:
+        followup_questions = input.followups
+        filtered_followups = {key: followup_questions[key] for key in missing_fields if key in followup_questions}
+        final_json = {
+            "status": "incomplete",
+            "missing_fields": missing_fields,
+            "followup_questions": filtered_followups,
+            "parsed_symptom": updated,
+            "required_fields": required_fields,
+            "primary_symptom_available": True
+        }
+        logger.debug('Third: %s', final_json)
+        return final_json
+
+    return {"status": "complete", "parsed_symptom": updated}
+
+
+async def _drafted_guidance(uid: str, session_id: Optional[str], final_json: Dict[str, Any]) -> Optional[str]:
+    if speculation and final_json["status"] == "complete":
+        return await speculation.take(uid, session_id, final_json["parsed_symptom"])
+    return None
+
+
+async def _complete(final_json: Dict[str, Any], label: str, draft: Optional[str] = None) -> Dict[str, Any]:
+    if final_json["status"] == "complete":
+        # Final guidance using full structured object
+        final_json["guidance"] = draft or await generate_guidance_with_llm(final_json["parsed_symptom"])
+        logger.debug('%s: %s', label, final_json)
+    return final_json
+
+
+def _stream_turn(final_json: Dict[str, Any], label: str, started: float, draft: Optional[str] = None) -> StreamingResponse:
+    """
+    NDJSON stream: a "parsed_symptom" frame, then "token" frames with the
+    guidance as it is generated, then a "final" frame carrying the same
+    payload the non-streaming endpoint returns. Incomplete turns are a single
+    "final" frame. A speculative draft goes out as one "token" frame.
+    """
+    async def frames():
+        if final_json["status"] != "complete":
+            yield json.dumps({"event": "final", **final_json}) + "\n"
+            return
+
+        yield json.dumps({"event": "parsed_symptom", "parsed_symptom": final_json["parsed_symptom"]}) + "\n"
+
+        tokens = []
+        first_token_at = None
+        guidance = _once(draft) if draft else stream_guidance_with_llm(final_json["parsed_symptom"])
+        async for token in guidance:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            tokens.append(token)
+            yield json.dumps({"event": "token", "content": token}) + "\n"
+
+        final_json["guidance"] = "".join(tokens)
+        yield json.dumps({"event": "final", **final_json}) + "\n"
+
+        total_ms = (time.perf_counter() - started) * 1000
+        ttfb_ms = (first_token_at - started) * 1000 if first_token_at else total_ms
+        logger.info('Guidance stream timings (ms): time_to_first_token=%.1f total=%.1f', ttfb_ms, total_ms)
+        logger.debug('%s: %s', label, final_json)
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+
+async def _once(text: str):
+    yield text
 
 
 @router.post("/pediatrician")
 async def pediatrician_agent(input: UserInput, user=Depends(verify_firebase_token)):
     uid = user["uid"]
 
-    # Step 1: Extract structured symptoms (run once)
-    structured = await parse_symptom_with_llm(input.message)
-    primary = structured.get("primary_symptom", "").strip().lower()
-
-    if not primary or not is_primary_symptom_valid(primary):
-            final_json = {
-                    "status": "incomplete",
-                    "missing_fields": [],
-                    "followup_questions": {"primary_symptom": "Your question is vague, please provide more details starting with some symptoms"},
-                    "parsed_symptom": {},
-                    "required_fields": [],
-                    "primary_symptom_available": False
-                }
-            print(f'Zero: {final_json}')
-            return final_json
-
-    else:
-        extra_required = await get_required_fields_from_llm(primary)
-        base_required = BASE_REQUIRED_FIELDS.copy()
-        required_fields = list(set(base_required + extra_required))
-
-        print(f'First Required Field Peditrician LLM Formulated: {required_fields}')
-
-        # Step 3: Identify missing fields
-        missing_fields = [field for field in required_fields if not structured.get(field)]
-
-        if missing_fields:
-            # Step 4: Generate follow-up questions once, only for the missing fields
-            followups = await generate_followup_questions_with_llm(missing_fields, primary)
-            final_json = {
-                "status": "incomplete",
-                "missing_fields": missing_fields,
-                "followup_questions": followups,
-                "parsed_symptom": structured,
-                "required_fields": required_fields,  # optional: useful for frontend or logging
-                "primary_symptom_available": True
-            }
-            print(f'First: {final_json}')
-            return final_json
-        
-        else:
-            # Step 5: Generate final guidance using full structured object
-            guidance = await generate_guidance_with_llm(structured)
-            final_json = {
-                "status": "complete",
-                "parsed_symptom": structured,
-                "guidance": guidance
-            }
-            print(f'Second: {final_json}')
-            return final_json
-    
+    final_json = await _first_turn(input.message, FIRST_TURN_LABELS)
+    await _remember(uid, new_session_id(), final_json, {}, input.use_session)
+    return await _complete(final_json, FIRST_TURN_LABELS["complete"])
 
 
 @router.post("/pediatrician/update")
 async def pediatrician_update(input: FollowupInput, user=Depends(verify_firebase_token)):
     uid = user["uid"]
 
-    primary_symptom_available = input.primary_symptom_available
-
-    print(f'Input from frontEnd: {input}')
-
-    if primary_symptom_available:
-
-        required_fields = input.required_fields
-        print(f'Required Field Peditrician Update EndPoint, Returned by FrontEnd: {required_fields}')
-
-        # Step 1: Merge new message into structured symptom
-        updated = await merge_symptom_update(input.existing_symptom, input.new_message, input.required_fields)
-
-        print(f'Updated strctured symptoms, backend update (First): {updated}')
-
-        # Step 2: Identify missing fields
-        missing_fields = [f for f in required_fields if not updated.get(f)]
-
-        print(f'Missing Fields, backend update (First): {updated}')
-
-        if missing_fields:
-            followup_questions = input.followups
-            filtered_followups = {key: followup_questions[key] for key in missing_fields if key in followup_questions}
-            final_json = {
-                "status": "incomplete",
-                "missing_fields": missing_fields,
-                "followup_questions": filtered_followups,
-                "parsed_symptom": updated,
-                "required_fields": required_fields,
-                "primary_symptom_available": True
-            }
-            print(f'Third: {final_json}')
-            return final_json
-
-        else:
-            # Step 6: Final guidance
-            guidance = await generate_guidance_with_llm(updated)
-            final_json = {
-                "status": "complete",
-                "parsed_symptom": updated,
-                "guidance": guidance
-            }
-            print(f'Fourth: {final_json}')
-            return final_json
-        
-    else:
-        structured = await parse_symptom_with_llm(input.new_message)
-        primary = structured.get("primary_symptom", "").strip().lower()
-
-        if not primary or not is_primary_symptom_valid(primary):
-            final_json = {
-                    "status": "incomplete",
-                    "missing_fields": [],
-                    "followup_questions": {"primary_symptom": "Your question is vague, please provide more details starting with some symptoms"},
-                    "parsed_symptom": {},
-                    "required_fields": [],
-                    "primary_symptom_available": False
-                }
-            print(f'Fifth: {final_json}')
-            return final_json
-
-        else:
-            extra_required = await get_required_fields_from_llm(primary)
-            base_required = BASE_REQUIRED_FIELDS.copy()
-            required_fields = list(set(base_required + extra_required))
-
-            # Step 3: Identify missing fields
-            missing_fields = [field for field in required_fields if not structured.get(field)]
-
-            if missing_fields:
-                # Step 4: Generate follow-up questions once, only for the missing fields
-                followups = await generate_followup_questions_with_llm(missing_fields, primary)
-                final_json = {
-                    "status": "incomplete",
-                    "missing_fields": missing_fields,
-                    "followup_questions": followups,
-                    "parsed_symptom": structured,
-                    "required_fields": required_fields,  # optional: useful for frontend or logging
-                    "primary_symptom_available": True
-                }
-                print(f'Sixth: {final_json}')
-                return final_json
-            
-            else:
-                # Step 5: Generate final guidance using full structured object
-                guidance = await generate_guidance_with_llm(structured)
-                final_json = {
-                    "status": "complete",
-                    "parsed_symptom": structured,
-                    "guidance": guidance
-                }
-                print(f'Seventh: {final_json}')
-                return final_json
-            
+    input = await _resolve_followup(input, uid)
+    final_json = await _update_turn(input)
+    await _remember(uid, input.session_id or new_session_id(), final_json, input.followups,
+                    use_session=input.session_id is not None)
+    draft = await _drafted_guidance(uid, input.session_id, final_json)
+    label = "Fourth" if input.primary_symptom_available else RESTART_LABELS["complete"]
+    return await _complete(final_json, label, draft)
+
+
+@router.post("/pediatrician/stream")
+async def pediatrician_agent_stream(input: UserInput, user=Depends(verify_firebase_token)):
+    started = time.perf_counter()
+    final_json = await _first_turn(input.message, FIRST_TURN_LABELS)
+    await _remember(user["uid"], new_session_id(), final_json, {}, input.use_session)
+    return _stream_turn(final_json, FIRST_TURN_LABELS["complete"], started)
+
+
+@router.post("/pediatrician/update/stream")
+async def pediatrician_update_stream(input: FollowupInput, user=Depends(verify_firebase_token)):
+    started = time.perf_counter()
+    input = await _resolve_followup(input, user["uid"])
+    final_json = await _update_turn(input)
+    await _remember(user["uid"], input.session_id or new_session_id(), final_json, input.followups,
+                    use_session=input.session_id is not None)
+    draft = await _drafted_guidance(user["uid"], input.session_id, final_json)
+    label = "Fourth" if input.primary_symptom_available else RESTART_LABELS["complete"]
+    return _stream_turn(final_json, label, started, draft)
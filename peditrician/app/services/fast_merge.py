@@ -0,0 +1,122 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Base fields the deterministic extractor knows how to fill
+FAST_PATH_FIELDS = ("duration", "age", "severity", "associated_symptoms")
+
+# Every triage asks for these; the symptom-specific extras come after them
+BASE_FIELDS = ("primary_symptom",) + FAST_PATH_FIELDS
+
+MIN_CONFIDENCE = float(os.getenv("FAST_MERGE_MIN_CONFIDENCE", "0.9"))
+
+_NUMBER = r"(?:\d+(?:\.\d+)?|a|an|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|a few|few|a couple of|couple of|half an?)"
+_UNIT = r"(?:minute|min|hour|hr|day|night|week|wk|month|mo|year|yr)s?"
+
+_DURATION = re.compile(
+    rf"\b(?:for\s+)?(?:about\s+|around\s+|almost\s+|over\s+)?({_NUMBER}\s+{_UNIT}(?:\s+(?:and\s+)?(?:a\s+)?half)?)(?:\s+(?:now|ago))?\b"
+    r"|\b(since\s+(?:yesterday|last\s+night|this\s+morning|today|last\s+week|(?:mon|tues|wednes|thurs|fri|satur|sun)day))\b"
+    r"|\b(yesterday|last\s+night|this\s+morning|today)\b",
+    re.IGNORECASE,
+)
+_AGE = re.compile(
+    rf"\b({_NUMBER}[\s-]+{_UNIT}[\s-]+old)\b"
+    rf"|\b(?:she|he|they|my\s+\w+|child|baby|son|daughter)?\s*(?:is|'s)?\s*(?:aged?\s+)?({_NUMBER}\s+{_UNIT})\b"
+    r"|\b(newborn|infant|toddler)\b",
+    re.IGNORECASE,
+)
+_SEVERITY = re.compile(
+    r"\b(\d{1,2}\s*(?:/|out\s+of)\s*10)\b"
+    r"|\b((?:very\s+|quite\s+|pretty\s+|really\s+)?(?:mild|moderate|severe|bad|serious|intense|light|slight))\b"
+    r"|\b(not\s+(?:too|that|very)\s+(?:bad|severe|serious))\b",
+    re.IGNORECASE,
+)
+_NONE = re.compile(
+    r"^\s*(?:no|none|nope|nothing|nah)\b"
+    r"|\bno\s+(?:other|associated|additional|more)\s+symptoms?\b"
+    r"|\bnothing\s+else\b|\bno\s+symptoms?\b|\bjust\s+(?:that|this|the)\b",
+    re.IGNORECASE,
+)
+
+# Words that carry no information of their own in a short answer
+_FILLER = {
+    "it", "its", "it's", "has", "have", "been", "for", "about", "around", "is", "was", "he", "she",
+    "they", "my", "the", "a", "an", "and", "just", "only", "i", "think", "so", "yes", "yeah", "ok",
+    "okay", "old", "now", "since", "started", "going", "on", "else", "other", "symptoms", "symptom",
+    "child", "baby", "son", "daughter", "kid", "no", "none", "nothing", "that", "this",
+}
+
+
+def _leftover_words(message: str, match: re.Match) -> List[str]:
+    rest = message[:match.start()] + " " + message[match.end():]
+    words = re.findall(r"[a-z0-9']+", rest.lower())
+    return [w for w in words if w not in _FILLER]
+
+
+def _confidence(message: str, match: re.Match) -> float:
+    # A bare answer ("3 days") is safe to merge; anything with more content
+    # may carry information (a new symptom, a correction) only the LLM can merge
+    leftover = _leftover_words(message, match)
+    if not leftover:
+        return 0.97
+    if len(leftover) == 1:
+        return 0.8
+    return 0.4
+
+
+def extract_field(field: str, message: str) -> Tuple[Optional[Any], float]:
+    """Returns (value, confidence) for one base field, or (None, 0.0)."""
+    message = message.strip()
+    if not message:
+        return None, 0.0
+
+    if field == "associated_symptoms":
+        match = _NONE.search(message)
+        if match:
+            return ["none"], _confidence(message, match)
+        return None, 0.0
+
+    pattern = {"duration": _DURATION, "age": _AGE, "severity": _SEVERITY}.get(field)
+    if pattern is None:
+        return None, 0.0
+
+    match = pattern.search(message)
+    if not match:
+        return None, 0.0
+    value = next(group for group in match.groups() if group)
+    return re.sub(r"\s+", " ", value.strip()).lower(), _confidence(message, match)
+
+
+class FastMergeStats:
+    def __init__(self):
+        self.fast_path = 0
+        self.llm_fallback = 0
+
+    def as_dict(self) -> dict:
+        total = self.fast_path + self.llm_fallback
+        return {
+            "fast_path": self.fast_path,
+            "llm_fallback": self.llm_fallback,
+            "fast_path_ratio": self.fast_path / total if total else 0.0,
+        }
+
+
+stats = FastMergeStats()
+
+
+def try_fast_merge(existing: Dict[str, Any], new_message: str, required_fields: List[str],
+                   min_confidence: float = MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+    """
+    Deterministically merges a short follow-up answer when exactly one known
+    base field is missing. Symptom-specific extras that are still missing
+    are left for the next turn. Returns None when the LLM merge should be used.
+    """
+    missing = [f for f in BASE_FIELDS if f in required_fields and not existing.get(f)]
+    if len(missing) != 1 or missing[0] not in FAST_PATH_FIELDS:
+        return None
+
+    field = missing[0]
+    value, confidence = extract_field(field, new_message)
+    if value is None or confidence < min_confidence:
+        return None
+    return {**existing, field: value}
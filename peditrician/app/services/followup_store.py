@@ -0,0 +1,86 @@
+import json
+import logging
+from typing import Awaitable, Callable, Dict, List
+from app.services.llm_cache import LRUCache, normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Seed entries under this symptom apply to every primary symptom (e.g. "age")
+ANY_SYMPTOM = "*"
+
+
+class FollowupQuestionStore:
+    """
+    Follow-up question wording per (primary_symptom, field).
+
+    Known pairs are served directly; all unknown pairs for a turn are sent to
+    the LLM in one prompt and remembered. Bounded by an LRU; seeded questions
+    live outside the LRU so they are never evicted.
+    """
+
+    def __init__(self, generate: Callable[[List[str], str], Awaitable[Dict[str, str]]], max_size: int = 2048):
+        self.generate = generate
+        self.learned = LRUCache(max_size)
+        self.seeded: Dict[tuple, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+
+    def seed_from_file(self, path: str):
+        """
+        Loads {"<symptom or *>": {"<field>": "<question>", ...}, ...}.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        for symptom, questions in data.items():
+            symptom_key = symptom if symptom == ANY_SYMPTOM else normalize_key(symptom)
+            for field, question in questions.items():
+                self.seeded[(symptom_key, field)] = question
+        logger.info("Seeded %d follow-up questions from %s", len(self.seeded), path)
+
+    def _lookup(self, symptom_key: str, field: str):
+        question = self.seeded.get((symptom_key, field))
+        if question:
+            return question
+        entry = self.learned.get((symptom_key, field))
+        if entry is not None:
+            return entry[1]
+        return self.seeded.get((ANY_SYMPTOM, field))
+
+    async def get_questions(self, missing_fields: List[str], primary_symptom: str) -> Dict[str, str]:
+        symptom_key = normalize_key(primary_symptom)
+        questions, unknown = {}, []
+
+        for field in missing_fields:
+            question = self._lookup(symptom_key, field)
+            if question:
+                questions[field] = question
+                self.hits += 1
+            else:
+                unknown.append(field)
+                self.misses += 1
+
+        if unknown:
+            # One batched prompt for every pair we haven't seen yet
+            self.llm_calls += 1
+            generated = await self.generate(unknown, primary_symptom)
+            for field in unknown:
+                question = generated.get(field)
+                if isinstance(question, str) and question.strip():
+                    self.learned.set((symptom_key, field), question)
+                    questions[field] = question
+
+        return questions
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "seeded": len(self.seeded),
+            "learned": len(self.learned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "llm_calls": self.llm_calls,
+            "evictions": self.learned.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
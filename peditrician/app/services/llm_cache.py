@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_key(text: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace ("Fever!" -> "fever")."""
+    text = _NON_WORD.sub(" ", text.strip().lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class LRUCache:
+    """
+    Bounded in-memory LRU. Entries remember when they were stored so callers
+    can decide whether a value is stale; nothing is dropped on age alone.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, value, stored_at: Optional[float] = None):
+        self._entries[key] = (stored_at if stored_at is not None else time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        return self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheTier:
+    """Persistent key/value tier on a local SQLite file. Values are stored as JSON."""
+
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self.table = table
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key: str):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return (row[1], json.loads(row[0])) if row else None
+
+    def _set(self, key: str, value: Any, stored_at: float):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), stored_at),
+            )
+
+    async def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, stored_at: float):
+        await asyncio.to_thread(self._set, key, value, stored_at)
+
+
+class RequiredFieldsCache:
+    """
+    Caches the extra required fields per primary symptom.
+
+    Lookups go memory -> disk tier -> LLM. Entries older than `ttl_seconds`
+    are still served, but trigger a single background refresh so the answer
+    is updated without ever blocking a triage turn on it.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[List[str]]], max_size: int = 512,
+                 ttl_seconds: float = 7 * 24 * 3600, disk: Optional[SqliteCacheTier] = None):
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_size)
+        self.disk = disk
+        self._refreshing = set()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def _load_and_store(self, key: str, symptom: str) -> List[str]:
+        fields = await self.fetch(symptom)
+        # An empty list usually means the LLM reply didn't parse; don't pin it
+        if fields:
+            stored_at = time.time()
+            self.memory.set(key, fields, stored_at)
+            if self.disk:
+                await self.disk.set(key, fields, stored_at)
+        return fields
+
+    async def _refresh(self, key: str, symptom: str):
+        try:
+            await self._load_and_store(key, symptom)
+            self.refreshes += 1
+        except Exception as e:
+            logger.warning("Background refresh for '%s' failed: %s", key, e)
+        finally:
+            self._refreshing.discard(key)
+
+    def _maybe_refresh(self, key: str, symptom: str, stored_at: float):
+        if time.time() - stored_at > self.ttl_seconds and key not in self._refreshing:
+            self._refreshing.add(key)
+            asyncio.create_task(self._refresh(key, symptom))
+
+    async def get(self, primary_symptom: str) -> List[str]:
+        key = normalize_key(primary_symptom)
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+            self._maybe_refresh(key, primary_symptom, entry[0])
+            return list(entry[1])
+
+        if self.disk:
+            entry = await self.disk.get(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry[1], entry[0])
+                self._maybe_refresh(key, primary_symptom, entry[0])
+                return list(entry[1])
+
+        self.misses += 1
+        return list(await self._load_and_store(key, primary_symptom))
+
+    async def preload(self, symptoms: Iterable[str], concurrency: int = 4):
+        """Warm start: pull common symptoms into memory, fetching only what isn't on disk."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(symptom: str):
+            key = normalize_key(symptom)
+            async with semaphore:
+                try:
+                    entry = await self.disk.get(key) if self.disk else None
+                    if entry is not None:
+                        self.memory.set(key, entry[1], entry[0])
+                    else:
+                        await self._load_and_store(key, symptom)
+                except Exception as e:
+                    logger.warning("Preload of '%s' failed: %s", symptom, e)
+
+        await asyncio.gather(*(load(s) for s in symptoms))
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "size": len(self.memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.memory.evictions,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+def disk_tier_from_env(table: str) -> Optional[SqliteCacheTier]:
+    path = os.getenv("LLM_CACHE_DB_PATH")
+    return SqliteCacheTier(path, table) if path else None
@@ -1,10 +1,24 @@
-from openai import AsyncOpenAI
-from typing import List, Dict, Any
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, AsyncIterator, Optional
 from app.services.read_secret import get_secret
+from childapp_shared.llm_client import LLMClient
+from app.services.llm_cache import RequiredFieldsCache, disk_tier_from_env, normalize_key
+from app.services.single_flight import SingleFlight, normalize_message
+from app.services.followup_store import FollowupQuestionStore
+from app.services import fast_merge
+import copy
 import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 API_KEY = get_secret("OPENAI_API_KEY")
-client = AsyncOpenAI(api_key=API_KEY)
+client = LLMClient.from_env(API_KEY)
+
+# Deadline budgets (seconds) for the short, latency-critical calls
+SHORT_CALL_DEADLINE = float(os.getenv("LLM_SHORT_CALL_DEADLINE_SECONDS", "20"))
+GUIDANCE_DEADLINE = float(os.getenv("LLM_GUIDANCE_DEADLINE_SECONDS", "90"))
 
 # Tool schema for structured symptom parsing
 symptom_tool = {
@@ -27,9 +41,26 @@ symptom_tool = {
 
 
 
+# Identical concurrent calls (double submits, many parents opening with
+# "my child has a fever") share one upstream request
+SINGLE_FLIGHT_MAX_INFLIGHT = int(os.getenv("SINGLE_FLIGHT_MAX_INFLIGHT", "1024"))
+parse_flight = SingleFlight("parse_symptom", SINGLE_FLIGHT_MAX_INFLIGHT)
+extract_flight = SingleFlight("extract_and_validate", SINGLE_FLIGHT_MAX_INFLIGHT)
+required_fields_flight = SingleFlight("required_fields", SINGLE_FLIGHT_MAX_INFLIGHT)
+
+
 # Symptom parser using LLM tool call
 async def parse_symptom_with_llm(message: str) -> dict:
-    res = await client.chat.completions.create(
+    shared = await parse_flight.do(normalize_message(message), lambda: _parse_symptom_with_llm(message))
+    # Every waiter gets the same object back; callers mutate it, so hand out copies
+    return copy.deepcopy(shared)
+
+
+async def _parse_symptom_with_llm(message: str) -> dict:
+    res = await client.chat(
+        stage="parse_symptom",
+        deadline=SHORT_CALL_DEADLINE,
+        hedge=True,
         model="gpt-4.1-2025-04-14",
         messages=[
             {"role": "system", "content": "Extract structured symptom details."},
@@ -43,6 +74,84 @@ async def parse_symptom_with_llm(message: str) -> dict:
 
 
 
+# Tool schema for the single-call first turn: symptom fields + validity + extra fields
+triage_tool = {
+    "type": "function",
+    "function": {
+        "name": "symptom_triage",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                **symptom_tool["function"]["parameters"]["properties"],
+                "is_valid_primary_symptom": {
+                    "type": "boolean",
+                    "description": "True only if primary_symptom is a specific pediatric symptom like 'fever', 'rash' or 'vomiting'. Vague terms like 'not well' or 'feeling off' are not valid."
+                },
+                "extra_required_fields": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "maxItems": 3,
+                    "description": "At most 3 additional clinically important fields to collect for this symptom, distinct from primary_symptom, duration, age, severity and associated_symptoms."
+                }
+            },
+            "required": ["is_valid_primary_symptom", "extra_required_fields"]
+        }
+    }
+}
+
+
+class TriageExtraction(BaseModel):
+    primary_symptom: Optional[str] = None
+    duration: Optional[str] = None
+    age: Optional[str] = None
+    severity: Optional[str] = None
+    associated_symptoms: Optional[List[str]] = None
+    is_valid_primary_symptom: bool = False
+    extra_required_fields: List[str] = []
+
+    def structured(self) -> dict:
+        """The symptom fields only, in the same shape parse_symptom_with_llm returns."""
+        fields = ["primary_symptom", "duration", "age", "severity", "associated_symptoms"]
+        return {f: getattr(self, f) for f in fields if getattr(self, f) is not None}
+
+
+class TriageExtractionError(Exception):
+    """The combined triage tool call came back without usable arguments."""
+
+
+# Parse, validate and pick extra fields in one gpt-4.1 tool call.
+# Raises TriageExtractionError if the tool arguments are missing or don't
+# validate; transport, rate-limit and deadline errors propagate unchanged.
+async def extract_and_validate_symptom_with_llm(message: str) -> TriageExtraction:
+    shared = await extract_flight.do(normalize_message(message), lambda: _extract_and_validate_symptom_with_llm(message))
+    return copy.deepcopy(shared)
+
+
+async def _extract_and_validate_symptom_with_llm(message: str) -> TriageExtraction:
+    res = await client.chat(
+        stage="extract_and_validate",
+        deadline=SHORT_CALL_DEADLINE,
+        hedge=True,
+        model="gpt-4.1-2025-04-14",
+        messages=[
+            {"role": "system", "content": "You are a pediatric triage assistant. Extract structured symptom details, judge whether the primary symptom is a valid specific pediatric symptom, and list extra fields worth collecting for it."},
+            {"role": "user", "content": message}
+        ],
+        tools=[triage_tool],
+        tool_choice={"type": "function", "function": {"name": "symptom_triage"}}
+    )
+    tool_calls = res.choices[0].message.tool_calls if res.choices else None
+    if not tool_calls:
+        raise TriageExtractionError("no symptom_triage tool call in the response")
+    try:
+        extraction = TriageExtraction(**json.loads(tool_calls[0].function.arguments))
+    except (json.JSONDecodeError, ValidationError, TypeError) as e:
+        raise TriageExtractionError(f"invalid symptom_triage arguments: {e}") from e
+    extraction.extra_required_fields = [f.strip() for f in extraction.extra_required_fields if f.strip()][:3]
+    return extraction
+
+
+
 async def is_primary_symptom_valid(symptom: str) -> bool:
     prompt = f"""
 The term "{symptom}" was extracted as a primary symptom.
@@ -51,7 +160,10 @@ Is this a valid, specific pediatric symptom (like "fever", "rash", "vomiting")?
 Vague terms like "not well", "feeling off", etc., are not valid primary symptom.
 Reply with "yes" or "no". 
 """
-    response = await client.chat.completions.create(
+    response = await client.chat(
+        stage="validate_symptom",
+        deadline=SHORT_CALL_DEADLINE,
+        hedge=True,
         model="gpt-3.5-turbo-0125",
         messages=[{"role": "user", "content": prompt}]
     )
@@ -61,8 +173,8 @@ Reply with "yes" or "no".
 
 
 
-# Get extra required fields for a given primary symptom
-async def get_required_fields_from_llm(primary_symptom: str) -> List[str]:
+# Get extra required fields for a given primary symptom (uncached LLM call)
+async def fetch_required_fields_from_llm(primary_symptom: str) -> List[str]:
     prompt = f"""
 You are a pediatric triage assistant.
 
@@ -77,7 +189,9 @@ Only return the array, no explanation or surrounding text.
 Ensure the additional fields are distinct from the base 5.
 """
 
-    response = await client.chat.completions.create(
+    response = await client.chat(
+        stage="required_fields",
+        deadline=SHORT_CALL_DEADLINE,
         model="gpt-4.1-2025-04-14",
         messages=[{"role": "user", "content": prompt}]
     )
@@ -92,9 +206,34 @@ Ensure the additional fields are distinct from the base 5.
         return []
 
 
+# The extra fields for a symptom are effectively stable, so cache them
+COMMON_SYMPTOMS = [
+    "fever", "cough", "rash", "vomiting", "diarrhea", "runny nose", "ear pain",
+    "sore throat", "abdominal pain", "headache", "constipation", "teething",
+]
 
+async def fetch_required_fields_coalesced(primary_symptom: str) -> List[str]:
+    return await required_fields_flight.do(
+        normalize_key(primary_symptom), lambda: fetch_required_fields_from_llm(primary_symptom)
+    )
 
-async def generate_followup_questions_with_llm(missing_fields: List[str], primary_symptom: str) -> Dict[str, str]:
+
+required_fields_cache = RequiredFieldsCache(
+    fetch_required_fields_coalesced,
+    max_size=int(os.getenv("REQUIRED_FIELDS_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("REQUIRED_FIELDS_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    disk=disk_tier_from_env("required_fields"),
+)
+
+
+async def get_required_fields_from_llm(primary_symptom: str) -> List[str]:
+    return await required_fields_cache.get(primary_symptom)
+
+
+
+
+# Uncached LLM call; returns {} when the reply can't be parsed
+async def fetch_followup_questions_from_llm(missing_fields: List[str], primary_symptom: str) -> Dict[str, str]:
     prompt = f"""
 You are a pediatric triage assistant.
 
@@ -112,23 +251,39 @@ Write one follow-up question per field in this JSON format:
 
 Be specific and clear. Only return a JSON object.
 """
-    response = await client.chat.completions.create(
+    response = await client.chat(
+        stage="followups",
+        deadline=SHORT_CALL_DEADLINE,
         model="gpt-3.5-turbo-0125",
         messages=[{"role": "user", "content": prompt}]
     )
 
     try:
-        return json.loads(response.choices[0].message.content.strip())
+        result = json.loads(response.choices[0].message.content.strip())
+        return result if isinstance(result, dict) else {}
     except Exception:
-        return {field: f"What is the value of '{field}'?" for field in missing_fields}
-    
+        return {}
 
 
+# Question wording per (symptom, field) rarely changes, so serve it from a store
+followup_store = FollowupQuestionStore(
+    fetch_followup_questions_from_llm,
+    max_size=int(os.getenv("FOLLOWUP_STORE_SIZE", "2048")),
+)
+followup_store.seed_from_file(os.getenv("FOLLOWUP_SEED_PATH", "app/data/followup_questions.json"))
 
 
-# Pediatric guidance generation
-async def generate_guidance_with_llm(parsed: dict) -> str:
-    prompt = f"""
+async def generate_followup_questions_with_llm(missing_fields: List[str], primary_symptom: str) -> Dict[str, str]:
+    questions = await followup_store.get_questions(missing_fields, primary_symptom)
+    for field in missing_fields:
+        questions.setdefault(field, f"What is the value of '{field}'?")
+    return questions
+
+
+
+
+def _guidance_prompt(parsed: dict) -> str:
+    return f"""
 You are a pediatrician. A parent has shared the following structured symptom information:
 
 {json.dumps(parsed, indent=2)}
@@ -141,13 +296,31 @@ Using all of this information, please provide guidance that includes:
 Be empathetic and concise.
 """
 
-    response = await client.chat.completions.create(
+
+# Pediatric guidance generation
+async def generate_guidance_with_llm(parsed: dict) -> str:
+    response = await client.chat(
+        stage="guidance",
+        deadline=GUIDANCE_DEADLINE,
         model="gpt-4.1-2025-04-14",
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": _guidance_prompt(parsed)}]
     )
     return response.choices[0].message.content
 
 
+# Same guidance, yielded token by token as OpenAI streams it
+async def stream_guidance_with_llm(parsed: dict) -> AsyncIterator[str]:
+    # Closing this generator (client went away) closes the upstream stream too
+    async for chunk in client.chat_stream(
+        stage="guidance_stream",
+        deadline=GUIDANCE_DEADLINE,
+        model="gpt-4.1-2025-04-14",
+        messages=[{"role": "user", "content": _guidance_prompt(parsed)}]
+    ):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
 
 
 
@@ -180,7 +353,7 @@ def build_dynamic_symptom_tool(required_fields: List[str]) -> Dict[str, Any]:
         else:
             # Default type for unknown fields
             dynamic_fields[field] = {"type": "string"}
-            print(f"[INFO] Added missing field '{field}' with default type 'string'")
+            logger.debug("Added missing field '%s' with default type 'string'", field)
 
     return {
         "type": "function",
@@ -198,12 +371,12 @@ def build_dynamic_symptom_tool(required_fields: List[str]) -> Dict[str, Any]:
 
 
 # Merge follow-up message into symptom object using LLM
-async def merge_symptom_update(existing: dict, new_message: str, required_fields: List[str]) -> dict:
+async def merge_symptom_update_with_llm(existing: dict, new_message: str, required_fields: List[str]) -> dict:
     dynamic_tool = build_dynamic_symptom_tool(required_fields)
 
-    print(f'dynamic tool: {dynamic_tool}')
-    print(f'existing symptoms: {existing}')
-    print(f'Required fields: {required_fields}')
+    logger.debug('dynamic tool: %s', dynamic_tool)
+    logger.debug('existing symptoms: %s', existing)
+    logger.debug('Required fields: %s', required_fields)
 
     prompt = f"""
 You are a pediatric triage assistant.
@@ -222,13 +395,28 @@ Rules:
 - Do not drop existing fields or override them.
 """
 
-    res = await client.chat.completions.create(
+    res = await client.chat(
+        stage="merge_update",
+        deadline=SHORT_CALL_DEADLINE,
+        hedge=True,
         model="gpt-4.1-2025-04-14",
         messages=[{"role": "user", "content": prompt}],
         tools=[dynamic_tool],
         tool_choice={"type": "function", "function": {"name": "symptom_parser"}}
     )
 
-    print(f'response from merge symptom update: {res}')
+    logger.debug('response from merge symptom update: %s', res)
+
+    return json.loads(res.choices[0].message.tool_calls[0].function.arguments)
 
-    return json.loads(res.choices[0].message.tool_calls[0].function.arguments)
\ No newline at end of file
+
+# Short answers to a single missing base field ("3 days", "none") skip the LLM
+async def merge_symptom_update(existing: dict, new_message: str, required_fields: List[str]) -> dict:
+    merged = fast_merge.try_fast_merge(existing, new_message, required_fields)
+    if merged is not None:
+        fast_merge.stats.fast_path += 1
+        logger.debug('Merged "%s" without an LLM call', new_message)
+        return merged
+
+    fast_merge.stats.llm_fallback += 1
+    return await merge_symptom_update_with_llm(existing, new_message, required_fields)
@@ -0,0 +1,107 @@
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from app.services.llm_cache import LRUCache
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+class SessionStore(ABC):
+    """
+    Server-side triage state between /pediatrician turns, keyed by uid and
+    session id so one user can never read another user's session. Session
+    state is a JSON-serialisable dict.
+    """
+
+    @abstractmethod
+    async def get(self, uid: str, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def save(self, uid: str, session_id: str, state: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, uid: str, session_id: str) -> None:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store with a TTL (reset on every save) and LRU eviction."""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        self._sessions = LRUCache(max_sessions)
+
+    async def get(self, uid: str, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._sessions.get((uid, session_id))
+        if entry is None:
+            return None
+        stored_at, state = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            self._sessions.pop((uid, session_id))
+            return None
+        return state
+
+    async def save(self, uid: str, session_id: str, state: Dict[str, Any]) -> None:
+        self._sessions.set((uid, session_id), state)
+
+    async def delete(self, uid: str, session_id: str) -> None:
+        self._sessions.pop((uid, session_id))
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions), "evictions": self._sessions.evictions}
+
+
+class RedisSessionStore(SessionStore):
+    """Shared store for multiple replicas. Requires the optional `redis` package."""
+
+    def __init__(self, url: str, ttl_seconds: float = 3600, prefix: str = "triage-session:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self._prefix = prefix
+
+    def _key(self, uid: str, session_id: str) -> str:
+        return f"{self._prefix}{uid}:{session_id}"
+
+    async def get(self, uid: str, session_id: str) -> Optional[Dict[str, Any]]:
+        payload = await self._redis.get(self._key(uid, session_id))
+        return json.loads(payload) if payload else None
+
+    async def save(self, uid: str, session_id: str, state: Dict[str, Any]) -> None:
+        await self._redis.set(self._key(uid, session_id), json.dumps(state), ex=int(self.ttl_seconds))
+
+    async def delete(self, uid: str, session_id: str) -> None:
+        await self._redis.delete(self._key(uid, session_id))
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+def session_store_from_env() -> SessionStore:
+    """
+    SESSION_STORE=memory (default) keeps sessions in this process only. With
+    more than one instance (Cloud Run max-instances > 1) a follow-up can land
+    on an instance that never saw the session; clients then fall back to
+    sending the full triage state. Use SESSION_STORE=redis to share sessions.
+    """
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+    if os.getenv("SESSION_STORE", "memory").lower() == "redis":
+        return RedisSessionStore(os.environ["SESSION_STORE_REDIS_URL"], ttl_seconds=ttl_seconds)
+    return InMemorySessionStore(
+        max_sessions=int(os.getenv("SESSION_STORE_MAX_SESSIONS", "10000")),
+        ttl_seconds=ttl_seconds,
+    )
+
+
+session_store = session_store_from_env()
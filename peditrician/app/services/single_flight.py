@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream request.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it is running await the same task. Waiters await it through
+    asyncio.shield, so a cancelled waiter (e.g. a client that disconnected)
+    only stops waiting: the shared request keeps running for everyone else
+    and is dropped from the table as soon as it finishes.
+
+    Nothing is cached after completion. At most `max_inflight` keys are
+    tracked; beyond that calls run uncoalesced instead of growing the table.
+    """
+
+    def __init__(self, name: str, max_inflight: int = 1024):
+        self.name = name
+        self.max_inflight = max_inflight
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.bypassed = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved; waiters (if any) already re-raised it
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("[%s] shared call for %r failed: %s", self.name, key, task.exception())
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        elif len(self._inflight) >= self.max_inflight:
+            self.bypassed += 1
+            return await fn()
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced + self.bypassed
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "coalesced_ratio": self.coalesced / calls if calls else 0.0,
+        }
+
+
+def normalize_message(message: str) -> str:
+    """Case- and whitespace-insensitive key for a free-text parent message."""
+    return " ".join(message.lower().split())
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.peditrician_telehealth import generate_guidance_with_llm
+from app.services.triage_pipeline import BASE_REQUIRED_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeGuidance:
+    """
+    Drafts the final guidance while the parent is still answering optional
+    questions.
+
+    When the only fields left are the non-critical extras picked for the
+    symptom, the draft is generated in the background from the current
+    symptom object. The draft is pinned to the fields it was drafted from:
+    the critical fields plus every extra that already had a value. On the
+    turn that completes the triage the draft is used if those are unchanged
+    (only the missing extras may have been filled in since); otherwise it
+    is cancelled and the guidance regenerated. A turn that changes them but
+    is still incomplete restarts the draft.
+
+    Drafts are process-local, keyed by (uid, session id), capped at
+    `max_drafts` (oldest cancelled first) and dropped after `ttl_seconds`.
+    """
+
+    def __init__(self, generate: Callable[[dict], Awaitable[str]], critical_fields: List[str],
+                 max_drafts: int = 1000, ttl_seconds: float = 900):
+        self.generate = generate
+        self.critical_fields = critical_fields
+        self.max_drafts = max_drafts
+        self.ttl_seconds = ttl_seconds
+        # (uid, session id) -> (pinned fields, fingerprint, created at, task)
+        self._drafts: "OrderedDict[Tuple[str, str], Tuple[List[str], str, float, asyncio.Task]]" = OrderedDict()
+
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.restarted = 0
+        self.discarded = 0
+        self.failed = 0
+
+    def pinned_fields(self, parsed: Dict[str, Any], required_fields: List[str]) -> List[str]:
+        """The critical fields plus the extras that are already answered."""
+        return self.critical_fields + [
+            f for f in required_fields if f not in self.critical_fields and parsed.get(f)
+        ]
+
+    def fingerprint(self, parsed: Dict[str, Any], fields: List[str]) -> str:
+        def norm(value):
+            if isinstance(value, str):
+                return " ".join(value.lower().split())
+            if isinstance(value, list):
+                return sorted(norm(v) for v in value)
+            return value
+        return json.dumps({f: norm(parsed.get(f)) for f in fields}, sort_keys=True)
+
+    def _drop(self, key: Tuple[str, str]):
+        entry = self._drafts.pop(key, None)
+        if entry is not None and not entry[3].done():
+            entry[3].cancel()
+        return entry
+
+    def _start(self, key: Tuple[str, str], parsed: Dict[str, Any], fields: List[str]):
+        task = asyncio.create_task(self.generate(dict(parsed)))
+        # A draft nobody collects must not log "exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._drafts[key] = (fields, self.fingerprint(parsed, fields), time.time(), task)
+        self.started += 1
+        while len(self._drafts) > self.max_drafts:
+            oldest = next(iter(self._drafts))
+            self._drop(oldest)
+            self.discarded += 1
+
+    def observe(self, uid: str, session_id: str, final_json: Dict[str, Any]):
+        """Called after every incomplete turn: starts, keeps, restarts or drops the session's draft."""
+        key = (uid, session_id)
+        missing = final_json.get("missing_fields") or []
+        optional_only = (
+            final_json.get("status") == "incomplete"
+            and final_json.get("primary_symptom_available")
+            and missing
+            and not any(f in self.critical_fields for f in missing)
+        )
+        if not optional_only:
+            if self._drop(key) is not None:
+                self.discarded += 1
+            return
+
+        parsed = final_json["parsed_symptom"]
+        entry = self._drafts.get(key)
+        if entry is not None:
+            if self._still_valid(entry, parsed):
+                self._drafts.move_to_end(key)
+                return
+            self._drop(key)
+            self.restarted += 1
+        self._start(key, parsed, self.pinned_fields(parsed, final_json.get("required_fields") or []))
+
+    def _still_valid(self, entry, parsed: Dict[str, Any]) -> bool:
+        fields, fingerprint, created_at, _ = entry
+        return fingerprint == self.fingerprint(parsed, fields) and time.time() - created_at <= self.ttl_seconds
+
+    async def take(self, uid: str, session_id: Optional[str], parsed: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the drafted guidance for a session that just completed, or
+        None if there is no usable draft (the caller then generates it).
+        """
+        entry = self._drafts.pop((uid, session_id), None) if session_id else None
+        if entry is None:
+            return None
+
+        task = entry[3]
+        if not self._still_valid(entry, parsed):
+            task.cancel()
+            self.misses += 1
+            return None
+
+        try:
+            guidance = await task
+        except Exception as e:
+            logger.warning("Speculative guidance draft failed, regenerating: %s", e)
+            self.failed += 1
+            return None
+        self.hits += 1
+        return guidance
+
+    def stats(self) -> dict:
+        resolved = self.hits + self.misses + self.failed
+        return {
+            "drafts": len(self._drafts),
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "restarted": self.restarted,
+            "discarded": self.discarded,
+            "failed": self.failed,
+            "hit_rate": self.hits / resolved if resolved else 0.0,
+        }
+
+
+def speculation_from_env(generate: Callable[[dict], Awaitable[str]], critical_fields: List[str]) -> Optional[SpeculativeGuidance]:
+    if os.getenv("SPECULATIVE_GUIDANCE", "false").lower() != "true":
+        return None
+    return SpeculativeGuidance(
+        generate,
+        critical_fields,
+        max_drafts=int(os.getenv("SPECULATIVE_GUIDANCE_MAX_DRAFTS", "1000")),
+        ttl_seconds=float(os.getenv("SPECULATIVE_GUIDANCE_TTL_SECONDS", "900")),
+    )
+
+
+speculation = speculation_from_env(generate_guidance_with_llm, BASE_REQUIRED_FIELDS)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Tuple
+from app.services.peditrician_telehealth import (
+    parse_symptom_with_llm,
+    get_required_fields_from_llm,
+    generate_followup_questions_with_llm,
+    is_primary_symptom_valid,
+    extract_and_validate_symptom_with_llm,
+    TriageExtractionError,
+)
+
+logger = logging.getLogger(__name__)
+
+BASE_REQUIRED_FIELDS = ["primary_symptom", "duration", "age", "severity", "associated_symptoms"]
+
+# "single": one combined extraction + validation tool call
+# "multi": separate parse / validate / required-fields calls
+EXTRACTION_MODE = os.getenv("TRIAGE_EXTRACTION_MODE", "single").lower()
+
+VAGUE_SYMPTOM_RESPONSE = {
+    "status": "incomplete",
+    "missing_fields": [],
+    "followup_questions": {"primary_symptom": "Your question is vague, please provide more details starting with some symptoms"},
+    "parsed_symptom": {},
+    "required_fields": [],
+    "primary_symptom_available": False
+}
+
+
+class StageTimer:
+    """Records wall-clock time per pipeline stage, plus the total."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    async def run(self, stage: str, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+    def summary(self) -> Dict[str, float]:
+        return {**self.timings, "total": round((time.perf_counter() - self.started) * 1000, 1)}
+
+
+async def _cancel(*tasks):
+    for task in tasks:
+        if task and not task.done():
+            task.cancel()
+    await asyncio.gather(*(t for t in tasks if t), return_exceptions=True)
+
+
+def _required_fields(extra_required: List[str]) -> List[str]:
+    # Base fields first, in a stable order
+    return BASE_REQUIRED_FIELDS + [f for f in extra_required if f not in BASE_REQUIRED_FIELDS]
+
+
+def _turn_payload(structured: Dict[str, Any], required_fields: List[str], followups: Dict[str, str]) -> Dict[str, Any]:
+    missing_fields = [field for field in required_fields if not structured.get(field)]
+    if not missing_fields:
+        return {"status": "complete", "parsed_symptom": structured}
+
+    # Any field the LLM skipped still gets a question
+    for field in missing_fields:
+        followups.setdefault(field, f"What is the value of '{field}'?")
+
+    return {
+        "status": "incomplete",
+        "missing_fields": missing_fields,
+        "followup_questions": {field: followups[field] for field in missing_fields},
+        "parsed_symptom": structured,
+        "required_fields": required_fields,
+        "primary_symptom_available": True
+    }
+
+
+async def run_first_turn(message: str, mode: str = EXTRACTION_MODE) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Runs the first pediatric turn and returns the response payload plus
+    per-stage timings in ms. When nothing is missing the payload has status
+    "complete" but no guidance yet; the caller generates it.
+    """
+    if mode == "multi":
+        return await _run_first_turn_multi(message)
+    return await _run_first_turn_single(message)
+
+
+async def _run_first_turn_single(message: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+        extract_and_validate ── followups
+    """
+    timer = StageTimer()
+
+    try:
+        extraction = await timer.run("extract_and_validate", extract_and_validate_symptom_with_llm(message))
+    except TriageExtractionError as e:
+        # The tool arguments didn't validate; the multi-call path still works.
+        # Upstream errors (deadline, 429/5xx, connection) propagate instead of
+        # tripling the calls during an outage.
+        logger.warning('Combined extraction failed, falling back to multi-call: %s', e)
+        return await _run_first_turn_multi(message)
+
+    structured = extraction.structured()
+    primary = (structured.get("primary_symptom") or "").strip().lower()
+    if not primary or not extraction.is_valid_primary_symptom:
+        return dict(VAGUE_SYMPTOM_RESPONSE), timer.summary()
+
+    required_fields = _required_fields(extraction.extra_required_fields)
+    missing_fields = [field for field in required_fields if not structured.get(field)]
+
+    followups = {}
+    if missing_fields:
+        followups = await timer.run("followups", generate_followup_questions_with_llm(missing_fields, primary))
+
+    return _turn_payload(structured, required_fields, followups), timer.summary()
+
+
+async def _run_first_turn_multi(message: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Dependency-aware pipeline over the separate LLM calls:
+
+        parse_symptom ──┬── validate_symptom
+                        ├── required_fields ── followups_extra
+                        └── followups_base (speculative)
+    """
+    timer = StageTimer()
+
+    # Step 1: Extract structured symptoms
+    structured = await timer.run("parse_symptom", parse_symptom_with_llm(message))
+    primary = (structured.get("primary_symptom") or "").strip().lower()
+
+    if not primary:
+        return dict(VAGUE_SYMPTOM_RESPONSE), timer.summary()
+
+    # Step 2: Everything below only depends on the parsed object, so fan out
+    base_missing = [f for f in BASE_REQUIRED_FIELDS if not structured.get(f)]
+
+    async def extra_fields_and_followups() -> Tuple[List[str], Dict[str, str]]:
+        extra_required = await timer.run("required_fields", get_required_fields_from_llm(primary))
+        extra_missing = [
+            f for f in extra_required if f not in BASE_REQUIRED_FIELDS and not structured.get(f)
+        ]
+        followups = {}
+        if extra_missing:
+            followups = await timer.run(
+                "followups_extra", generate_followup_questions_with_llm(extra_missing, primary)
+            )
+        return extra_required, followups
+
+    validate_task = asyncio.create_task(timer.run("validate_symptom", is_primary_symptom_valid(primary)))
+    extra_task = asyncio.create_task(extra_fields_and_followups())
+    base_followups_task = None
+    if base_missing:
+        # Speculative: only used if the symptom turns out to be valid
+        base_followups_task = asyncio.create_task(
+            timer.run("followups_base", generate_followup_questions_with_llm(base_missing, primary))
+        )
+
+    try:
+        is_valid = await validate_task
+    except BaseException:
+        await _cancel(extra_task, base_followups_task)
+        raise
+
+    if not is_valid:
+        await _cancel(extra_task, base_followups_task)
+        return dict(VAGUE_SYMPTOM_RESPONSE), timer.summary()
+
+    if base_followups_task:
+        (extra_required, extra_followups), base_followups = await asyncio.gather(extra_task, base_followups_task)
+    else:
+        extra_required, extra_followups = await extra_task
+        base_followups = {}
+
+    # Step 3: Identify missing fields and assemble the payload
+    followups = {**base_followups, **extra_followups}
+    return _turn_payload(structured, _required_fields(extra_required), followups), timer.summary()
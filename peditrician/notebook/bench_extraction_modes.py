@@ -0,0 +1,135 @@
+# Compares the single-call and multi-call first-turn extraction modes against
+# an in-process OpenAI stand-in (no network, no quota).
+# Run from the peditrician/ directory:
+#   PYTHONPATH=. python notebook/bench_extraction_modes.py --time-scale 0.1
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-local-stand-in")
+
+from app.services import peditrician_telehealth
+from app.services.llm_cache import LRUCache
+from app.services.triage_pipeline import run_first_turn
+
+MESSAGES = [
+    "My 2 year old has had a fever of 102 since yesterday, no other symptoms",
+    "my baby has a rash on her arms",
+    "Son keeps coughing at night for 3 days, he's 5",
+    "she's not well",
+    "my toddler has been vomiting, it's pretty bad",
+]
+
+# (fixed ms, ms per completion token) per model
+LATENCY_MODEL = {"gpt-4.1-2025-04-14": (450, 12), "gpt-3.5-turbo-0125": (250, 6)}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _fake_symptoms(message: str) -> dict:
+    text = message.lower()
+    parsed = {}
+    for symptom in ("fever", "rash", "cough", "vomiting"):
+        if symptom in text or (symptom == "cough" and "coughing" in text):
+            parsed["primary_symptom"] = symptom
+            break
+    else:
+        parsed["primary_symptom"] = "not well"
+    if m := re.search(r"(\d+ days|since yesterday)", text):
+        parsed["duration"] = m.group(1)
+    if m := re.search(r"(\d+) year old|he's (\d+)", text):
+        parsed["age"] = f"{m.group(1) or m.group(2)} years"
+    if "pretty bad" in text:
+        parsed["severity"] = "severe"
+    if "no other symptoms" in text:
+        parsed["associated_symptoms"] = ["none"]
+    return parsed
+
+
+class FakeCompletions:
+    """Mimics client.chat.completions with canned answers and modelled latency."""
+
+    def __init__(self, time_scale: float):
+        self.time_scale = time_scale
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _reply(self, messages, tools):
+        prompt = messages[-1]["content"]
+        if tools:
+            parsed = _fake_symptoms(prompt)
+            if tools[0]["function"]["name"] == "symptom_triage":
+                parsed["is_valid_primary_symptom"] = parsed["primary_symptom"] != "not well"
+                parsed["extra_required_fields"] = ["temperature reading", "hydration status"]
+            return None, json.dumps(parsed)
+        if "valid, specific pediatric symptom" in prompt:
+            return ("no" if 'The term "not well"' in prompt else "yes"), None
+        if "additional** clinically relevant" in prompt:
+            return '["temperature reading", "hydration status"]', None
+        if "missing fields" in prompt:
+            fields = json.loads(re.search(r"missing fields:\n(\[.*?\])", prompt, re.S).group(1))
+            return json.dumps({f: f"Could you tell me about the {f}?" for f in fields}), None
+        return "Keep your child hydrated and monitor their temperature.", None
+
+    async def create(self, model, messages, tools=None, tool_choice=None, **kwargs):
+        content, arguments = self._reply(messages, tools)
+        completion = _tokens(content or arguments)
+        prompt = _tokens(json.dumps(messages) + json.dumps(tools or []))
+
+        fixed_ms, per_token_ms = LATENCY_MODEL.get(model, (300, 10))
+        await asyncio.sleep((fixed_ms + per_token_ms * completion) / 1000 * self.time_scale)
+
+        self.calls += 1
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+
+        tool_calls = [SimpleNamespace(function=SimpleNamespace(arguments=arguments))] if arguments else None
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content, tool_calls=tool_calls))],
+            usage=SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion),
+        )
+
+
+def _reset_caches():
+    # Cold caches so both modes pay for their LLM calls
+    peditrician_telehealth.required_fields_cache.memory = LRUCache(512)
+    peditrician_telehealth.followup_store.learned = LRUCache(2048)
+
+
+async def main(args):
+    fake = FakeCompletions(args.time_scale)
+    # Swap the transport-level client so retries/semaphores stay in the measured path
+    peditrician_telehealth.client.openai = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+
+    print(f"{'mode':<8}{'calls/turn':>12}{'prompt tok':>12}{'compl tok':>11}{'mean ms':>10}{'max ms':>9}")
+    for mode in ("multi", "single"):
+        fake.reset()
+        latencies = []
+        for _ in range(args.rounds):
+            _reset_caches()
+            for message in MESSAGES:
+                start = time.perf_counter()
+                await run_first_turn(message, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000 / args.time_scale)
+
+        turns = len(latencies)
+        print(f"{mode:<8}{fake.calls / turns:>12.2f}{fake.prompt_tokens / turns:>12.0f}"
+              f"{fake.completion_tokens / turns:>11.0f}{sum(latencies) / turns:>10.0f}{max(latencies):>9.0f}")
+    print("(token counts are per turn; latencies are modelled ms, rescaled by --time-scale)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,163 @@
+# Exercises LLMClient's retry, deadline and hedging policy against a local
+# fake OpenAI endpoint (httpx.MockTransport, no network).
+# Run from the peditrician/ directory (with `pip install -e ../shared`):
+#   PYTHONPATH=. python notebook/check_llm_client.py
+import asyncio
+import json
+import time
+
+import httpx
+
+from childapp_shared.llm_client import LLMClient, LLMDeadlineExceeded
+
+
+def completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-local",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4.1-2025-04-14",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    }
+
+
+class FakeServer:
+    """Plays back a script of (delay seconds, status code) per request."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+        self.completed = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        delay, status = self.script[min(self.requests, len(self.script) - 1)]
+        self.requests += 1
+        await asyncio.sleep(delay)
+        self.completed += 1
+        if status != 200:
+            return httpx.Response(status, json={"error": {"message": "injected", "type": "server_error"}})
+        return httpx.Response(200, json=completion(f"reply {self.requests}"))
+
+
+def make_client(server: FakeServer, **kwargs) -> LLMClient:
+    return LLMClient(api_key="sk-local", base_url="http://fake/v1", transport=httpx.MockTransport(server),
+                     backoff_base=0.01, **kwargs)
+
+
+async def chat(client: LLMClient, **kwargs):
+    return await client.chat(model="gpt-4.1-2025-04-14", messages=[{"role": "user", "content": "hi"}], **kwargs)
+
+
+async def check_retries():
+    server = FakeServer([(0, 429), (0, 503), (0, 200)])
+    client = make_client(server)
+    res = await chat(client)
+    assert res.choices[0].message.content == "reply 3" and client.retries == 2
+    print("retries on 429/5xx:      ok", json.dumps(client.stats()))
+
+
+async def check_no_retry_on_4xx():
+    server = FakeServer([(0, 400), (0, 200)])
+    client = make_client(server)
+    try:
+        await chat(client)
+        raise AssertionError("expected a 400 to be raised")
+    except Exception as e:
+        assert server.requests == 1, e
+    print("no retry on 400:         ok")
+
+
+async def check_deadline():
+    server = FakeServer([(1.0, 200)])
+    client = make_client(server)
+    start = time.monotonic()
+    try:
+        await chat(client, deadline=0.2)
+        raise AssertionError("expected deadline to be exceeded")
+    except LLMDeadlineExceeded:
+        assert time.monotonic() - start < 0.5
+    print("deadline budget:         ok")
+
+
+async def check_hedging():
+    # First request is slow, the hedge fired after 50ms answers quickly
+    server = FakeServer([(1.0, 200), (0.01, 200)])
+    client = make_client(server, hedge_after=0.05)
+    start = time.monotonic()
+    res = await chat(client, hedge=True)
+    elapsed = time.monotonic() - start
+    assert res.choices[0].message.content == "reply 2" and elapsed < 0.5, elapsed
+    assert client.hedges_fired == 1 and client.hedges_won == 1
+    print(f"hedged request:          ok ({elapsed * 1000:.0f} ms instead of ~1000 ms)")
+
+
+async def check_hedge_cancelled_by_caller():
+    # Cancelling the caller before the hedge fires must cancel the primary too
+    for hedge_after in (0.5, None):
+        server = FakeServer([(0.2, 200)])
+        client = make_client(server, hedge_after=hedge_after)
+        call = asyncio.create_task(chat(client, hedge=True))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        await asyncio.sleep(0.3)
+        assert server.requests == 1 and server.completed == 0, (server.requests, server.completed)
+    print("hedge caller cancelled:  ok (primary cancelled, no orphan request)")
+
+
+async def check_hedge_wins_simultaneous_failure():
+    # Primary fails and hedge succeeds in the same wakeup: the success is returned
+    client = make_client(FakeServer([(0, 200)]), hedge_after=0.01)
+    release = asyncio.Event()
+
+    async def with_retries(kwargs, deadline_at, stage):
+        await release.wait()
+        if stage.endswith("[hedge]"):
+            return "hedge result"
+        raise RuntimeError("primary failed")
+
+    client._with_retries = with_retries
+    call = asyncio.create_task(client.chat(model="gpt-4.1-2025-04-14", messages=[], hedge=True))
+    await asyncio.sleep(0.05)
+    release.set()
+    assert await call == "hedge result" and client.hedges_won == 1
+    print("hedge beats failed peer: ok")
+
+
+async def check_hedge_delay_per_stage():
+    # Slow guidance calls on the same model must not stretch the parse hedge delay
+    server = FakeServer([(0.3, 200)] * 20 + [(0.01, 200)] * 20)
+    client = make_client(server, hedge_min_samples=20)
+    await asyncio.gather(*(chat(client, stage="guidance") for _ in range(20)))
+    await asyncio.gather(*(chat(client, stage="parse") for _ in range(20)))
+    delays = client.stats()["hedge_delay_ms"]
+    model = "gpt-4.1-2025-04-14"
+    assert delays[f"parse/{model}"] < 100 < delays[f"guidance/{model}"], delays
+    print("hedge delay per stage:   ok", json.dumps(delays))
+
+
+async def check_concurrency_limit():
+    server = FakeServer([(0.05, 200)])
+    client = make_client(server, global_concurrency=2)
+    start = time.monotonic()
+    await asyncio.gather(*(chat(client) for _ in range(6)))
+    elapsed = time.monotonic() - start
+    assert elapsed >= 0.15, elapsed
+    print(f"global semaphore:        ok (6 calls, limit 2, {elapsed * 1000:.0f} ms)")
+
+
+async def main():
+    await check_retries()
+    await check_no_retry_on_4xx()
+    await check_deadline()
+    await check_hedging()
+    await check_hedge_cancelled_by_caller()
+    await check_hedge_wins_simultaneous_failure()
+    await check_hedge_delay_per_stage()
+    await check_concurrency_limit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+# Replays recorded /pediatrician/update turns through the rule-based fast
+# path and compares it with the LLM merge.
+# Run from the peditrician/ directory:
+#   PYTHONPATH=. python notebook/eval_fast_merge.py --turns notebook/sample_turns.jsonl --record
+#
+# Each line: {"existing_symptom": {...}, "new_message": "...", "required_fields": [...],
+#             "llm_merged": {...}}   <- optional; fetched from OpenAI when absent
+# required_fields are the 5 base fields followed by the symptom's extras, as
+# the triage produces them. --record writes the fetched LLM merges back to
+# the file so later --offline runs can compare against them.
+import argparse
+import asyncio
+import json
+from collections import Counter
+
+from app.services.fast_merge import try_fast_merge, extract_field, BASE_FIELDS, MIN_CONFIDENCE
+
+
+def _norm(value) -> str:
+    if isinstance(value, list):
+        return ",".join(sorted(_norm(v) for v in value))
+    return " ".join(str(value).lower().replace("-", " ").split())
+
+
+def missing_base_field(turn):
+    return next((f for f in BASE_FIELDS if f in turn["required_fields"] and not turn["existing_symptom"].get(f)), None)
+
+
+def agrees(fast_value, llm_value) -> bool:
+    a, b = _norm(fast_value), _norm(llm_value)
+    return a == b or (bool(a) and bool(b) and (a in b or b in a))
+
+
+async def main(args):
+    with open(args.turns) as f:
+        turns = [json.loads(line) for line in f if line.strip()]
+
+    needs_llm = [t for t in turns if "llm_merged" not in t]
+    if needs_llm and not args.offline:
+        from app.services.peditrician_telehealth import merge_symptom_update_with_llm
+        results = await asyncio.gather(*(
+            merge_symptom_update_with_llm(t["existing_symptom"], t["new_message"], t["required_fields"])
+            for t in needs_llm
+        ))
+        for turn, merged in zip(needs_llm, results):
+            turn["llm_merged"] = merged
+        if args.record:
+            with open(args.turns, "w") as f:
+                f.writelines(json.dumps(t) + "\n" for t in turns)
+
+    fast_count, compared, agreed = 0, 0, 0
+    by_field = Counter()
+    disagreements = []
+
+    for turn in turns:
+        merged = try_fast_merge(turn["existing_symptom"], turn["new_message"],
+                                turn["required_fields"], min_confidence=args.min_confidence)
+        if merged is None:
+            continue
+
+        fast_count += 1
+        field = missing_base_field(turn)
+        by_field[field] += 1
+
+        if "llm_merged" in turn:
+            compared += 1
+            if agrees(merged[field], turn["llm_merged"].get(field)):
+                agreed += 1
+            else:
+                disagreements.append((turn["new_message"], field, merged[field], turn["llm_merged"].get(field)))
+
+    print(f"Turns replayed:                {len(turns)}")
+    print(f"Answered without OpenAI call:  {fast_count} ({fast_count / max(1, len(turns)):.1%})")
+    print(f"Fast path by field:            {dict(by_field)}")
+    if compared:
+        print(f"Agreement with LLM merge:      {agreed}/{compared} ({agreed / compared:.1%})")
+    if compared < fast_count:
+        print(f"Fast-path turns with no recorded LLM merge to compare: {fast_count - compared}")
+    for message, field, fast_value, llm_value in disagreements:
+        print(f"  DISAGREE [{field}] {message!r}: fast={fast_value!r} llm={llm_value!r}")
+
+    if args.verbose:
+        for turn in turns:
+            field = missing_base_field(turn)
+            if field:
+                print(f"  {field:<20} {turn['new_message']!r:<45} -> {extract_field(field, turn['new_message'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", required=True)
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--offline", action="store_true", help="Skip turns without a recorded llm_merged")
+    parser.add_argument("--record", action="store_true", help="Write fetched LLM merges back to --turns")
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(main(parser.parse_args()))
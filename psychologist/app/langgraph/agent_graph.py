@@ -1,6 +1,19 @@
+import asyncio
+import logging
+import time
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END, START
 from typing import Dict, List, Union, TypedDict
-from app.langgraph.tools import check_context_completeness, generate_psychological_guidance
+from app.langgraph.tools import (
+    check_context_completeness,
+    generate_psychological_guidance,
+    stream_psychological_guidance,
+    build_guidance_prompt,
+)
+from app.langgraph.context_window import count_tokens
+from app.langgraph.overlap import overlap_policy
+
+logger = logging.getLogger(__name__)
 
 
 class AgentState(TypedDict):
@@ -9,11 +22,13 @@ class AgentState(TypedDict):
     ready_to_answer: bool
     followup_question: Union[str, None]
     final_guidance: Union[str, None]
+    turn: int  # 1-based parent message number in this conversation
 
 
 async def check_completeness_node(state: AgentState) -> AgentState:
     """Asks tools whether we have enough context to answer, or need follow-ups."""
     result = await check_context_completeness(state["history"], state["new_message"])
+    overlap_policy.observe(state.get("turn", 1), result["ready_to_answer"])
     return {
         **state,
         "ready_to_answer": result["ready_to_answer"],
@@ -28,23 +43,111 @@ async def check_completeness_decision_node(state: AgentState) -> AgentState:
         return END
 
 
-async def generate_guidance_node(state: AgentState) -> AgentState:
-    """Generates final psychological guidance when ready."""
-    final = await generate_psychological_guidance(state["history"], state["new_message"])
+async def generate_guidance_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Generates final psychological guidance when ready. If the caller passes
+    an async `on_token` callback in config["configurable"], the guidance is
+    streamed and every token is handed to it as it arrives.
+    """
+    on_token = config.get("configurable", {}).get("on_token")
+    return {
+        **state,
+        "final_guidance": await _guidance(state, on_token),
+    }
+
+
+async def _guidance(state: AgentState, on_token=None) -> str:
+    if on_token is None:
+        return await generate_psychological_guidance(state["history"], state["new_message"])
+    tokens = []
+    async for token in stream_psychological_guidance(state["history"], state["new_message"]):
+        tokens.append(token)
+        await on_token(token)
+    return "".join(tokens).strip()
+
+
+async def check_and_draft_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Overlap mode: drafts the guidance while the completeness check runs.
+    Draft tokens are held back until the check says ready, then forwarded to
+    `on_token` in order (and live from then on). If the check says not
+    ready, the draft is cancelled, which closes its upstream stream. If the
+    draft fails, the guidance is generated the sequential way instead.
+    """
+    on_token = config.get("configurable", {}).get("on_token")
+    queue: asyncio.Queue = asyncio.Queue()
+    drafted: List[str] = []
+
+    async def draft():
+        try:
+            async for token in stream_psychological_guidance(state["history"], state["new_message"]):
+                drafted.append(token)
+                queue.put_nowait(token)
+        finally:
+            queue.put_nowait(None)
+
+    draft_task = asyncio.create_task(draft())
+    started = time.monotonic()
+    try:
+        result = await check_context_completeness(state["history"], state["new_message"])
+    except BaseException:
+        draft_task.cancel()
+        await asyncio.gather(draft_task, return_exceptions=True)
+        raise
+    check_seconds = time.monotonic() - started
+    overlap_policy.observe(state.get("turn", 1), result["ready_to_answer"])
+
+    if not result["ready_to_answer"]:
+        draft_task.cancel()
+        await asyncio.gather(draft_task, return_exceptions=True)
+        overlap_policy.record_wasted(count_tokens(build_guidance_prompt(state["history"], state["new_message"])),
+                                     count_tokens("".join(drafted)))
+        return {
+            **state,
+            "ready_to_answer": False,
+            "followup_question": result.get("followup_question"),
+        }
+
+    tokens = []
+    while (token := await queue.get()) is not None:
+        tokens.append(token)
+        if on_token is not None:
+            await on_token(token)
+
+    try:
+        await draft_task
+        # Sequentially the guidance call would only have started now
+        overlap_policy.record_kept(check_seconds)
+        final = "".join(tokens).strip()
+    except Exception as e:
+        overlap_policy.record_failed()
+        logger.warning("Guidance draft failed, generating it again: %s", e)
+        # Partial frames already went out for the forwarded tokens; the
+        # "complete" frame carries the full guidance either way
+        final = await _guidance(state, on_token if not tokens else None)
+
     return {
         **state,
+        "ready_to_answer": True,
+        "followup_question": None,
         "final_guidance": final,
     }
 
 
+def choose_mode_node(state: AgentState) -> str:
+    return "check_and_draft" if overlap_policy.should_overlap(state.get("turn", 1)) else "check_completeness"
+
+
 def build_agent():
     """Builds a stateless LangGraph agent that relies on external history management."""
     builder = StateGraph(AgentState)
 
     builder.add_node("check_completeness", check_completeness_node)
     builder.add_node("generate_guidance", generate_guidance_node)
-    builder.add_edge(START, "check_completeness")
+    builder.add_node("check_and_draft", check_and_draft_node)
+    builder.add_conditional_edges(START, choose_mode_node, {"check_completeness": "check_completeness", "check_and_draft": "check_and_draft"})
     builder.add_conditional_edges("check_completeness", check_completeness_decision_node, {"generate_guidance": "generate_guidance", END: END})
     builder.add_edge("generate_guidance", END)
+    builder.add_edge("check_and_draft", END)
 
     return builder.compile()
\ No newline at end of file
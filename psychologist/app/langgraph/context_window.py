@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, str]
+
+_encoding = None
+_encoding_failed = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens in `text` for the gpt-4.1 tokenizer (tiktoken's o200k_base).
+    If the encoding can't be loaded (no network and no TIKTOKEN_CACHE_DIR),
+    falls back to ~4 characters per token so budgets still apply.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning("tiktoken unavailable, estimating tokens from length: %s", e)
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def tokenizer_name() -> str:
+    count_tokens("")
+    return "o200k_base" if _encoding is not None else "chars/4 estimate"
+
+
+def message_tokens(message: Message) -> int:
+    # Prompts embed history as indented JSON, so count it the same way
+    return count_tokens(json.dumps(message, indent=2))
+
+
+class ConversationWindow:
+    """
+    The part of a psychologist conversation that goes into prompts.
+
+    The last `keep_turns` exchanges stay verbatim. Older messages are folded
+    into a rolling summary by `summarize(previous_summary, messages)`, which
+    runs in the background between turns. Until it catches up, the
+    not-yet-summarized messages are included verbatim if they fit.
+    messages() never renders more than `token_budget` tokens: the oldest
+    verbatim messages are dropped first, the latest one never is.
+
+    `history` is the full transcript; the window only reads it.
+    """
+
+    def __init__(self, history: List[Message], summarize: Callable[[str, List[Message]], Awaitable[str]],
+                 keep_turns: int = 4, token_budget: int = 1500):
+        self.history = history
+        self.summarize = summarize
+        self.keep_messages = keep_turns * 2
+        self.token_budget = token_budget
+        self.summary = ""
+        self.summarized_upto = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _summary_message(self) -> Optional[Message]:
+        if not self.summary:
+            return None
+        return {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}
+
+    def messages(self) -> List[Message]:
+        """Summary message (if any) plus as many recent messages as the budget allows."""
+        summary = self._summary_message()
+        budget = self.token_budget - (message_tokens(summary) if summary else 0)
+
+        recent: List[Message] = []
+        for message in reversed(self.history[self.summarized_upto:]):
+            cost = message_tokens(message)
+            if recent and cost > budget:
+                break
+            recent.append(message)
+            budget -= cost
+
+        recent.reverse()
+        return ([summary] if summary else []) + recent
+
+    def prompt_tokens(self) -> int:
+        return sum(message_tokens(m) for m in self.messages())
+
+    def update(self):
+        """Call after each turn: starts a background summary if messages left the window."""
+        if self._task and not self._task.done():
+            return
+        fold_upto = len(self.history) - self.keep_messages
+        if fold_upto <= self.summarized_upto:
+            return
+        self._task = asyncio.create_task(self._fold(fold_upto))
+
+    async def _fold(self, fold_upto: int):
+        try:
+            self.summary = await self.summarize(self.summary, self.history[self.summarized_upto:fold_upto])
+            self.summarized_upto = fold_upto
+        except Exception as e:
+            # Keep the old summary; the messages stay verbatim until the next try
+            logger.warning("Conversation summary failed: %s", e)
+
+    async def settle(self):
+        """Waits for a running summary (benchmarks and tests)."""
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+
+CONTEXT_WINDOW = os.getenv("PSYCHOLOGIST_CONTEXT_WINDOW", "true").lower() == "true"
+CONTEXT_KEEP_TURNS = int(os.getenv("PSYCHOLOGIST_CONTEXT_KEEP_TURNS", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PSYCHOLOGIST_CONTEXT_TOKEN_BUDGET", "1500"))
@@ -0,0 +1,98 @@
+import os
+from collections import deque
+from typing import Deque, Dict
+
+from childapp_shared.llm_metrics import estimate_cost
+
+GUIDANCE_MODEL = "gpt-4.1-2025-04-14"
+
+
+class OverlapPolicy:
+    """
+    Decides per turn whether the graph drafts guidance concurrently with the
+    completeness check ("overlap") or only after it says ready.
+
+    mode "off" never overlaps, "on" always does, and "adaptive" overlaps
+    when the recent readiness rate at this turn number is at least
+    `min_ready_rate`. Rates come from the last `window` checks per turn
+    number (turns past 8 share a bucket), smoothed so an unseen turn starts
+    at 0.5.
+
+    Also keeps the bookkeeping for the trade-off: latency saved by drafts
+    that were kept versus tokens spent on drafts that were cancelled.
+    """
+
+    MAX_TURN_BUCKET = 8
+
+    def __init__(self, mode: str = "off", min_ready_rate: float = 0.5, window: int = 50):
+        self.mode = mode
+        self.min_ready_rate = min_ready_rate
+        self.window = window
+        self._outcomes: Dict[int, Deque[bool]] = {}
+
+        self.overlapped = 0
+        self.sequential = 0
+        self.kept = 0
+        self.wasted = 0
+        self.failed = 0
+        self.saved_seconds = 0.0
+        self.wasted_prompt_tokens = 0
+        self.wasted_completion_tokens = 0
+
+    def _bucket(self, turn: int) -> int:
+        return min(max(turn, 1), self.MAX_TURN_BUCKET)
+
+    def ready_rate(self, turn: int) -> float:
+        outcomes = self._outcomes.get(self._bucket(turn), ())
+        return (sum(outcomes) + 1) / (len(outcomes) + 2)
+
+    def should_overlap(self, turn: int) -> bool:
+        if self.mode == "on":
+            overlap = True
+        elif self.mode == "adaptive":
+            overlap = self.ready_rate(turn) >= self.min_ready_rate
+        else:
+            overlap = False
+        if overlap:
+            self.overlapped += 1
+        else:
+            self.sequential += 1
+        return overlap
+
+    def observe(self, turn: int, ready: bool):
+        self._outcomes.setdefault(self._bucket(turn), deque(maxlen=self.window)).append(bool(ready))
+
+    def record_kept(self, saved_seconds: float):
+        self.kept += 1
+        self.saved_seconds += saved_seconds
+
+    def record_wasted(self, prompt_tokens: int, completion_tokens: int):
+        self.wasted += 1
+        self.wasted_prompt_tokens += prompt_tokens
+        self.wasted_completion_tokens += completion_tokens
+
+    def record_failed(self):
+        self.failed += 1
+
+    def stats(self) -> dict:
+        drafts = self.kept + self.wasted
+        return {
+            "overlapped": self.overlapped,
+            "sequential": self.sequential,
+            "drafts_kept": self.kept,
+            "drafts_wasted": self.wasted,
+            "drafts_failed": self.failed,
+            "keep_rate": self.kept / drafts if drafts else 0.0,
+            "saved_seconds_total": round(self.saved_seconds, 3),
+            "saved_ms_per_kept": round(self.saved_seconds * 1000 / self.kept, 1) if self.kept else 0.0,
+            "wasted_prompt_tokens": self.wasted_prompt_tokens,
+            "wasted_completion_tokens": self.wasted_completion_tokens,
+            "wasted_cost_usd": round(estimate_cost(GUIDANCE_MODEL, self.wasted_prompt_tokens, self.wasted_completion_tokens), 6),
+        }
+
+
+overlap_policy = OverlapPolicy(
+    mode=os.getenv("PSYCHOLOGIST_OVERLAP_MODE", "off").lower(),
+    min_ready_rate=float(os.getenv("PSYCHOLOGIST_OVERLAP_MIN_READY_RATE", "0.5")),
+    window=int(os.getenv("PSYCHOLOGIST_OVERLAP_WINDOW", "50")),
+)
@@ -1,9 +1,18 @@
-from openai import AsyncOpenAI
 from app.services.read_secret import get_secret
+from childapp_shared.llm_client import LLMClient
 import json
+import os
 
 API_KEY = get_secret("OPENAI_API_KEY")
-client = AsyncOpenAI(api_key=API_KEY)
+client = LLMClient.from_env(API_KEY)
+
+# Deadline budgets (seconds) per call
+COMPLETENESS_DEADLINE = float(os.getenv("LLM_COMPLETENESS_DEADLINE_SECONDS", "20"))
+GUIDANCE_DEADLINE = float(os.getenv("LLM_GUIDANCE_DEADLINE_SECONDS", "90"))
+SUMMARY_DEADLINE = float(os.getenv("LLM_SUMMARY_DEADLINE_SECONDS", "30"))
+
+# Upper bound on the rolling conversation summary
+SUMMARY_MAX_TOKENS = int(os.getenv("PSYCHOLOGIST_SUMMARY_MAX_TOKENS", "300"))
 
 async def check_context_completeness(history, new_message):
     prompt = f"""
@@ -32,15 +41,19 @@ If no, respond:
 Respond only with the JSON.
 """
 
-    response = await client.chat.completions.create(
+    response = await client.chat(
+        stage="check_completeness",
+        deadline=COMPLETENESS_DEADLINE,
+        hedge=True,
         model="gpt-4.1-2025-04-14",
         messages=[{"role": "user", "content": prompt}]
     )
     return json.loads(response.choices[0].message.content.strip())
 
 
-async def generate_psychological_guidance(history, new_message):
-    prompt = f"""
+# Also used by the graph to count the prompt tokens of a discarded draft
+def build_guidance_prompt(history, new_message):
+    return f"""
 You are a child psychologist. A parent has shared the following concern about their child.
 
 Here is the conversation history:
@@ -57,8 +70,51 @@ Provide empathetic, professional, and concise guidance. Include:
 Respond in natural language only.
 """
 
-    response = await client.chat.completions.create(
+
+async def generate_psychological_guidance(history, new_message):
+    response = await client.chat(
+        stage="psychological_guidance",
+        deadline=GUIDANCE_DEADLINE,
         model="gpt-4.1-2025-04-14",
+        messages=[{"role": "user", "content": build_guidance_prompt(history, new_message)}]
+    )
+    return response.choices[0].message.content.strip()
+
+
+# Same guidance, yielded token by token. Cancelling the consumer closes the
+# upstream stream, so tokens stop being generated (and billed) right away.
+async def stream_psychological_guidance(history, new_message):
+    async for chunk in client.chat_stream(
+        stage="psychological_guidance_stream",
+        deadline=GUIDANCE_DEADLINE,
+        model="gpt-4.1-2025-04-14",
+        messages=[{"role": "user", "content": build_guidance_prompt(history, new_message)}]
+    ):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+# Folds older messages into the rolling summary the context window keeps
+async def summarize_conversation(previous_summary, messages):
+    prompt = f"""
+You keep a running summary of a parent's conversation with a psychologist assistant about their child.
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New messages to fold in:
+{json.dumps(messages, indent=2)}
+
+Write the updated summary in at most {SUMMARY_MAX_TOKENS // 2} words. Keep every concrete detail about the child
+(age, behaviours, duration, triggers, what has been tried) and drop small talk.
+Respond with the summary text only.
+"""
+
+    response = await client.chat(
+        stage="summarize_context",
+        deadline=SUMMARY_DEADLINE,
+        model="gpt-4.1-mini-2025-04-14",
+        max_tokens=SUMMARY_MAX_TOKENS,
         messages=[{"role": "user", "content": prompt}]
     )
     return response.choices[0].message.content.strip()
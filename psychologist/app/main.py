@@ -1,11 +1,30 @@
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi import WebSocket, WebSocketDisconnect
 print("🧪 trying to import psychologist_route...")
 from app.routes.psychologist_route import router as psychologist_route
 print("✅ psychologist_route imported successfully")
+from app.langgraph.tools import client as llm_client
+from childapp_shared.llm_metrics import metrics as llm_metrics, render_gauges
+from app.langgraph.overlap import overlap_policy
+from app.services.auth_dependency import token_verifier
 
-app = FastAPI()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+# httpx logs every OpenAI request at INFO; the "llm" logger already samples them
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await llm_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,4 +38,22 @@ app.include_router(psychologist_route)
 
 @app.get("/")
 def ping():
-    return {"message": "Psychologist backend is running"}
\ No newline at end of file
+    return {"message": "Psychologist backend is running"}
+
+
+def _component_stats() -> dict:
+    return {
+        "llm_client": llm_client.stats(),
+        "overlap": overlap_policy.stats(),
+        "auth_token_cache": token_verifier.stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    return _component_stats()
+
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return llm_metrics.render_prometheus() + render_gauges("psychologist", _component_stats())
@@ -1,11 +1,78 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.services.auth_dependency import verify_firebase_token, verify_firebase_token_wss
 from app.langgraph.agent_graph import build_agent
+from app.langgraph.context_window import ConversationWindow, CONTEXT_WINDOW, CONTEXT_KEEP_TURNS, CONTEXT_TOKEN_BUDGET
+from app.langgraph.tools import summarize_conversation
     
 
 router = APIRouter()
 graph = build_agent()
 
+# Wire protocols for /ws/child-psychologist:
+#   legacy - every reply carries the full "history" (older clients, default)
+#   delta  - every reply carries only the new assistant message and "seq",
+#            the number of history entries the client should now hold. The
+#            client sends {"type": "resync"} (or a "last_seq" that doesn't
+#            match) to get the full history back in a "resync" frame.
+# Clients opt in with the "delta.v1" WebSocket subprotocol or ?protocol=delta.
+DELTA_SUBPROTOCOL = "delta.v1"
+
+# Guidance tokens go out as {"status": "partial", "delta": ...} frames
+# before the "complete" frame; clients that don't know them ignore them.
+STREAM_GUIDANCE = os.getenv("PSYCHOLOGIST_STREAM_GUIDANCE", "true").lower() == "true"
+
+
+def _negotiate_protocol(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """Returns (protocol, subprotocol to accept with)."""
+    if DELTA_SUBPROTOCOL in (websocket.scope.get("subprotocols") or []):
+        return "delta", DELTA_SUBPROTOCOL
+    if websocket.query_params.get("protocol") == "delta":
+        return "delta", None
+    return "legacy", None
+
+
+def _resync_frame(history: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {"status": "resync", "history": history, "seq": len(history)}
+
+
+def _reply_frame(protocol: str, frame: Dict[str, Any], reply: Optional[str], history: List[Dict[str, str]]) -> Dict[str, Any]:
+    if protocol == "legacy":
+        return {**frame, "history": history}
+    message = {"role": "assistant", "content": reply} if reply else None
+    return {**frame, "message": message, "seq": len(history)}
+
+
+async def _read_frames(websocket: WebSocket, incoming: asyncio.Queue):
+    """
+    Reads client frames into `incoming` until the client goes away, then
+    puts None. Reading in the background is what lets a turn notice a
+    disconnect while the agent is still running.
+    """
+    try:
+        while True:
+            await incoming.put(await websocket.receive_json())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        await incoming.put(e)
+    finally:
+        await incoming.put(None)
+
+
+async def _run_turn(turn, reader: asyncio.Task) -> Optional[Dict[str, Any]]:
+    """Runs one agent turn; returns None (and cancels the turn) if the client disconnects first."""
+    turn = asyncio.ensure_future(turn)
+    await asyncio.wait({turn, reader}, return_when=asyncio.FIRST_COMPLETED)
+    if turn.done():
+        return turn.result()
+    # Cancelling the graph closes the upstream OpenAI stream mid-generation
+    turn.cancel()
+    await asyncio.gather(turn, return_exceptions=True)
+    return None
+
 
 @router.websocket("/ws/child-psychologist")
 async def websocket_endpoint(websocket: WebSocket):
@@ -17,18 +84,36 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close(code=4401)
         return
 
-    await websocket.accept()
-    print("⚡️ WebSocket connection accepted")
+    protocol, subprotocol = _negotiate_protocol(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    print(f"⚡️ WebSocket connection accepted ({protocol} protocol)")
 
     history = []
+    # Prompts see a bounded window (recent turns + rolling summary), not the whole transcript
+    window = ConversationWindow(history, summarize_conversation, CONTEXT_KEEP_TURNS, CONTEXT_TOKEN_BUDGET) if CONTEXT_WINDOW else None
+    incoming = asyncio.Queue()
+    reader = asyncio.create_task(_read_frames(websocket, incoming))
+
+    async def send_partial(token: str):
+        await websocket.send_json({"status": "partial", "delta": token})
+
+    config = {"configurable": {"on_token": send_partial}} if STREAM_GUIDANCE else None
 
     try:
         while True:
-            try:
-                data = await websocket.receive_json()
-            except WebSocketDisconnect:
+            data = await incoming.get()
+            if data is None:
                 print("🔌 Client disconnected")
                 break
+            if isinstance(data, Exception):
+                raise data
+
+            if protocol == "delta":
+                last_seq = data.get("last_seq")
+                if data.get("type") == "resync" or (last_seq is not None and last_seq != len(history)):
+                    await websocket.send_json(_resync_frame(history))
+                    if data.get("type") == "resync":
+                        continue
 
             message = data.get("message")
             if not message:
@@ -36,15 +121,19 @@ async def websocket_endpoint(websocket: WebSocket):
 
             # 1️⃣ Prepare agent state
             state = {
-                "history": history,
+                "history": window.messages() if window else history,
                 "new_message": message,
                 "ready_to_answer": False,
                 "followup_question": None,
-                "final_guidance": None
+                "final_guidance": None,
+                "turn": sum(1 for m in history if m["role"] == "user") + 1,
             }
 
-            # 2️⃣ Invoke agent
-            result = await graph.ainvoke(state)
+            # 2️⃣ Invoke agent (stops early if the client disconnects)
+            result = await _run_turn(graph.ainvoke(state, config=config), reader)
+            if result is None:
+                print("🔌 Client disconnected mid-turn, agent cancelled")
+                break
 
             # 3️⃣ Append user turn
             history.append({"role": "user", "content": message})
@@ -53,25 +142,32 @@ async def websocket_endpoint(websocket: WebSocket):
             if result.get("ready_to_answer") and result.get("final_guidance"):
                 reply = result["final_guidance"]
                 history.append({"role": "assistant", "content": reply})
-                await websocket.send_json({
+                await websocket.send_json(_reply_frame(protocol, {
                     "status": "complete",
                     "guidance": reply,
-                    "history": history,
-                })
+                }, reply, history))
                 # 🔹 Do not close; frontend will close after complete
             else:
                 reply = result.get("followup_question")
                 if reply:
                     history.append({"role": "assistant", "content": reply})
-                await websocket.send_json({
+                await websocket.send_json(_reply_frame(protocol, {
                     "status": "incomplete",
                     "followup_question": reply,
-                    "history": history,
-                })
+                }, reply, history))
+
+            # 5️⃣ Fold turns that left the window into the summary while the parent types
+            if window:
+                window.update()
 
     except Exception as e:
         print(f"❗ Unexpected server error: {e}")
         try:
             await websocket.send_json({"status": "error", "message": str(e)})
-        finally:
-            await websocket.close()
\ No newline at end of file
+            await websocket.close()
+        except Exception:
+            pass  # the socket is already gone
+    finally:
+        reader.cancel()
+        if window:
+            window.close()
\ No newline at end of file
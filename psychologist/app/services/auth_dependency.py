@@ -1,6 +1,11 @@
 from app import firebase_config  # ensures SDK is initialized
 from fastapi import Depends, HTTPException, Request, WebSocket
 from firebase_admin import auth
+from childapp_shared.token_cache import verifier_from_env
+
+# Verification runs on a worker thread; repeat tokens are served from an
+# in-process cache until shortly before their exp
+token_verifier = verifier_from_env(auth.verify_id_token)
 
 async def verify_firebase_token(request: Request):
     auth_header = request.headers.get("Authorization")
@@ -10,7 +15,7 @@ async def verify_firebase_token(request: Request):
     id_token = auth_header.split(" ")[1]
 
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = await token_verifier(id_token)
         return {
             "uid": decoded_token["uid"],
             "email": decoded_token.get("email", "unknown"),
@@ -27,7 +32,7 @@ async def verify_firebase_token_wss(websocket: WebSocket):
 
     # Use your existing Firebase token verification logic here
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await token_verifier(token)
         return {
             "uid": decoded_token["uid"],
             "email": decoded_token.get("email", "unknown"),
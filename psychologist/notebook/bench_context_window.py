@@ -0,0 +1,72 @@
+# Prompt tokens per turn for the psychologist completeness/guidance prompts,
+# full transcript vs ConversationWindow (recent turns + rolling summary).
+# Offline: the summarizer is simulated with a summary of fixed token size, so
+# only the window logic and the tokenizer are measured.
+#   cd psychologist && PYTHONPATH=. python notebook/bench_context_window.py --turns 40
+import argparse
+import asyncio
+import json
+
+from app.langgraph.context_window import ConversationWindow, count_tokens, tokenizer_name
+
+PARENT = "My {age} year old has been {behaviour} for about {weeks} weeks, mostly at bedtime and before school. We tried {tried} but it didn't help much."
+ASSISTANT = "Thank you for sharing that. Can you tell me more about how {behaviour} shows up, and whether anything changed at home or school around {weeks} weeks ago?"
+BEHAVIOURS = ["refusing to go to school", "having tantrums", "not sleeping", "very withdrawn", "biting classmates"]
+
+# The fixed part of check_context_completeness's prompt, around the history
+PROMPT_OVERHEAD = count_tokens(
+    "You are a child psychologist assistant. A parent is seeking guidance about their child's mental health. "
+    "Here is the full conversation history: Here is the latest message from the parent: "
+    "Based on all the above, do you have enough information to give helpful psychological guidance? "
+    'If yes, respond: {"ready_to_answer": true, "followup_question": null} If no, respond: '
+    '{"ready_to_answer": false, "followup_question": "Ask ONE clear, empathetic follow-up that will help you gather what\'s missing."} '
+    "Respond only with the JSON."
+)
+
+
+def turn(i: int):
+    b = BEHAVIOURS[i % len(BEHAVIOURS)]
+    user = PARENT.format(age=3 + i % 9, behaviour=b, weeks=1 + i % 6, tried="a sticker chart")
+    return {"role": "user", "content": user}, {"role": "assistant", "content": ASSISTANT.format(behaviour=b, weeks=1 + i % 6)}
+
+
+def prompt_tokens(history) -> int:
+    return PROMPT_OVERHEAD + count_tokens(json.dumps(history, indent=2))
+
+
+async def main(args):
+    summary_text = " ".join(["detail"] * args.summary_tokens)
+
+    async def summarize(previous, messages):
+        return summary_text
+
+    history = []
+    window = ConversationWindow(history, summarize, keep_turns=args.keep_turns, token_budget=args.budget)
+
+    print(f"tokenizer: {tokenizer_name()}  keep_turns={args.keep_turns}  budget={args.budget}")
+    print(f"{'turn':>5}{'full history':>14}{'window':>10}{'saved':>8}")
+    total_full = total_window = 0
+    for i in range(1, args.turns + 1):
+        full = prompt_tokens(history)
+        windowed = prompt_tokens(window.messages())
+        total_full += full
+        total_window += windowed
+        if i in (1, 2, 5) or i % args.every == 0:
+            saved = 1 - windowed / full if full else 0.0
+            print(f"{i:>5}{full:>14}{windowed:>10}{saved:>8.0%}")
+        history.extend(turn(i))
+        window.update()
+        await window.settle()
+
+    print(f"\ntotal prompt tokens over {args.turns} turns: full={total_full} window={total_window} "
+          f"({1 - total_window / total_full:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--keep-turns", type=int, default=4)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--summary-tokens", type=int, default=200)
+    parser.add_argument("--every", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
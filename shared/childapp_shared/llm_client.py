@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from childapp_shared.llm_metrics import LLMMetrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LLMDeadlineExceeded(Exception):
+    """The call's deadline budget ran out before a response arrived."""
+
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+def _is_retryable(error: Exception) -> bool:
+    # APITimeoutError is a subclass of APIConnectionError
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _outcome(error: Exception) -> str:
+    if isinstance(error, openai.RateLimitError):
+        return "rate_limited"
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection_error"
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return "server_error"
+    return "error"
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_model_limits(spec: str) -> Dict[str, int]:
+    """"gpt-4.1-2025-04-14=16,gpt-3.5-turbo-0125=32" -> {model: limit}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, limit = item.partition("=")
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+class LLMClient:
+    """
+    One tuned OpenAI client per process.
+
+    - a pooled httpx client (keep-alive, bounded connections, connect timeout)
+    - a deadline budget per call that covers every attempt and backoff
+    - jittered exponential retries on 429 / 5xx / connection errors
+    - a global and a per-model concurrency semaphore
+    - optional hedging: a duplicate request is fired once the first has taken
+      longer than the recent p95 of the same stage on the same model, and
+      whichever answers first wins
+    - per-attempt instrumentation (stage, model, latency, tokens, outcome)
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        connect_timeout: float = 5.0,
+        default_deadline: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_cap: float = 4.0,
+        global_concurrency: int = 64,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        hedge_after: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        metrics: Optional[LLMMetrics] = None,
+    ):
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(default_deadline, connect=connect_timeout),
+            transport=transport,
+        )
+        # Retries are handled here so they respect the deadline budget
+        self.openai = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self.http, max_retries=0)
+
+        self.default_deadline = default_deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.global_concurrency = global_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self._global_semaphore = asyncio.Semaphore(global_concurrency)
+        self._model_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        # Fixed hedge delay in seconds; None means "use the recent p95 of the
+        # (stage, model)" - a short parse call must not wait out the p95 of
+        # long guidance calls on the same model
+        self.hedge_after = hedge_after
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+
+        self.metrics = metrics or default_metrics
+
+        self.retries = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str]) -> "LLMClient":
+        hedge_after_ms = os.getenv("LLM_HEDGE_AFTER_MS")
+        return cls(
+            api_key=api_key,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "20")),
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")),
+            default_deadline=float(os.getenv("LLM_DEFAULT_DEADLINE_SECONDS", "60")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            global_concurrency=int(os.getenv("LLM_GLOBAL_CONCURRENCY", "64")),
+            model_concurrency=_parse_model_limits(os.getenv("LLM_MODEL_CONCURRENCY", "")),
+            hedge_after=float(hedge_after_ms) / 1000 if hedge_after_ms else None,
+        )
+
+    def _model_semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._model_semaphores:
+            limit = self.model_concurrency.get(model, self.global_concurrency)
+            self._model_semaphores[model] = asyncio.Semaphore(limit)
+        return self._model_semaphores[model]
+
+    def _record_latency(self, stage: str, model: str, seconds: float):
+        self._latencies.setdefault((stage, model), deque(maxlen=200)).append(seconds)
+
+    def _hedge_delay(self, stage: str, model: str) -> Optional[float]:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        samples = self._latencies.get((stage, model))
+        if not samples or len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def _attempt(self, kwargs: Dict[str, Any], timeout: float, stage: str):
+        model = kwargs.get("model", "")
+        async with self._global_semaphore, self._model_semaphore(model):
+            start = time.monotonic()
+            try:
+                result = await self.openai.chat.completions.create(**kwargs, timeout=timeout)
+            except asyncio.CancelledError:
+                # Deadline hit or a hedge lost the race
+                self.metrics.record(stage, model, time.monotonic() - start, "cancelled")
+                raise
+            except Exception as e:
+                self.metrics.record(stage, model, time.monotonic() - start, _outcome(e), error=type(e).__name__)
+                raise
+
+            latency = time.monotonic() - start
+            # Hedge attempts count towards the stage they duplicate
+            self._record_latency(stage.removesuffix("[hedge]"), model, latency)
+            usage = getattr(result, "usage", None)
+            self.metrics.record(
+                stage, model, latency, "ok",
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            )
+            return result
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline_at: float) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error should be raised."""
+        if not _is_retryable(error) or attempt >= self.max_retries:
+            return None
+        # Full jitter, but never sleep shorter than the server asked
+        backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        backoff = max(backoff, _retry_after(error) or 0)
+        if time.monotonic() + backoff >= deadline_at:
+            return None
+        return backoff
+
+    async def _with_retries(self, kwargs: Dict[str, Any], deadline_at: float, stage: str):
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMDeadlineExceeded(f"{stage}: deadline exceeded")
+            try:
+                return await asyncio.wait_for(self._attempt(kwargs, remaining, stage), remaining)
+            except asyncio.TimeoutError:
+                raise LLMDeadlineExceeded(f"{stage}: deadline exceeded")
+            except Exception as e:
+                backoff = self._retry_delay(e, attempt, deadline_at)
+                if backoff is None:
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning("%s: retry %d after %s, sleeping %.2fs", stage, attempt, type(e).__name__, backoff)
+                await asyncio.sleep(backoff)
+
+    async def _hedged(self, kwargs: Dict[str, Any], deadline_at: float, stage: str):
+        delay = self._hedge_delay(stage, kwargs.get("model", ""))
+        primary = asyncio.create_task(self._with_retries(kwargs, deadline_at, stage))
+        tasks = [primary]
+        try:
+            # No delay yet (too few samples): just wait for the primary
+            await asyncio.wait({primary}, timeout=delay)
+            if primary.done():
+                return primary.result()
+
+            self.hedges_fired += 1
+            hedge = asyncio.create_task(self._with_retries(kwargs, deadline_at, f"{stage}[hedge]"))
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Both can finish together: any success beats a failure
+                succeeded = [task for task in tasks if task in done and task.exception() is None]
+                if succeeded:
+                    if succeeded[0] is hedge:
+                        self.hedges_won += 1
+                    return succeeded[0].result()
+                if not pending:
+                    raise (primary if primary in done else hedge).exception()
+        finally:
+            # Caller cancelled, deadline hit or a winner returned: nothing keeps running
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def chat(self, *, stage: str = "llm", deadline: Optional[float] = None, hedge: bool = False, **kwargs):
+        """
+        chat.completions.create with the client's deadline, retry and
+        concurrency policy. `deadline` is the total budget in seconds.
+        """
+        deadline_at = time.monotonic() + (deadline or self.default_deadline)
+        if hedge:
+            return await self._hedged(kwargs, deadline_at, stage)
+        return await self._with_retries(kwargs, deadline_at, stage)
+
+    async def chat_stream(self, *, stage: str = "llm", deadline: Optional[float] = None, **kwargs) -> AsyncIterator[Any]:
+        """
+        Streams completion chunks. Retries only apply to opening the stream;
+        the concurrency slots are held until the stream is finished or closed.
+        """
+        deadline_at = time.monotonic() + (deadline or self.default_deadline)
+        model = kwargs.get("model", "")
+        async with self._global_semaphore, self._model_semaphore(model):
+            start = time.monotonic()
+            outcome, usage = "ok", None
+            stream = await self._open_stream(kwargs, deadline_at, stage)
+            try:
+                async for chunk in stream:
+                    if time.monotonic() > deadline_at:
+                        raise LLMDeadlineExceeded(f"{stage}: deadline exceeded while streaming")
+                    # The last chunk carries usage when include_usage is set
+                    usage = getattr(chunk, "usage", None) or usage
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                outcome = _outcome(e)
+                raise
+            finally:
+                await stream.close()
+                self.metrics.record(
+                    stage, model, time.monotonic() - start, outcome,
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                    completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                )
+
+    async def _open_stream(self, kwargs: Dict[str, Any], deadline_at: float, stage: str):
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMDeadlineExceeded(f"{stage}: deadline exceeded")
+            try:
+                return await self.openai.chat.completions.create(
+                    **kwargs, stream=True, stream_options={"include_usage": True}, timeout=remaining
+                )
+            except Exception as e:
+                backoff = self._retry_delay(e, attempt, deadline_at)
+                if backoff is None:
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(backoff)
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedge_delay_ms": {
+                f"{stage}/{model}": round(delay * 1000, 1)
+                for stage, model in self._latencies
+                if (delay := self._hedge_delay(stage, model)) is not None
+            },
+        }
+
+    async def aclose(self):
+        await self.http.aclose()
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import random
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("llm")
+
+# USD per 1M tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4.1-2025-04-14": (2.00, 8.00),
+    "gpt-4.1-mini-2025-04-14": (0.40, 1.60),
+    "gpt-3.5-turbo-0125": (0.50, 1.50),
+}
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class LLMMetrics:
+    """
+    Per-call LLM instrumentation: latency histogram, token and cost counters
+    by (stage, model, outcome), rendered in the Prometheus text format.
+    A sample of successful calls (and every failure) is also logged as one
+    JSON line on the "llm" logger.
+    """
+
+    def __init__(self, prefix: str, log_sample_rate: float = 0.1):
+        self.prefix = prefix
+        self.log_sample_rate = log_sample_rate
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._tokens: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._cost: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._latency_buckets: Dict[Tuple[str, str], list] = {}
+        self._latency_sum: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._latency_count: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def record(self, stage: str, model: str, latency: float, outcome: str,
+               prompt_tokens: int = 0, completion_tokens: int = 0, error: Optional[str] = None):
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._calls[(stage, model, outcome)] += 1
+            self._tokens[(stage, model, "prompt")] += prompt_tokens
+            self._tokens[(stage, model, "completion")] += completion_tokens
+            self._cost[(stage, model)] += cost
+
+            key = (stage, model)
+            buckets = self._latency_buckets.setdefault(key, [0] * len(LATENCY_BUCKETS))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    buckets[i] += 1
+            self._latency_sum[key] += latency
+            self._latency_count[key] += 1
+
+        if outcome != "ok" or random.random() < self.log_sample_rate:
+            logger.info(json.dumps({
+                "event": "llm_call",
+                "stage": stage,
+                "model": model,
+                "outcome": outcome,
+                "latency_ms": round(latency * 1000, 1),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(cost, 6),
+                **({"error": error} if error else {}),
+            }))
+
+    def render_prometheus(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_llm_calls_total LLM calls by stage, model and outcome",
+            f"# TYPE {p}_llm_calls_total counter",
+        ]
+        with self._lock:
+            for (stage, model, outcome), n in sorted(self._calls.items()):
+                lines.append(f'{p}_llm_calls_total{{stage="{stage}",model="{model}",outcome="{outcome}"}} {n}')
+
+            lines += [f"# HELP {p}_llm_tokens_total LLM tokens by stage, model and kind",
+                      f"# TYPE {p}_llm_tokens_total counter"]
+            for (stage, model, kind), n in sorted(self._tokens.items()):
+                lines.append(f'{p}_llm_tokens_total{{stage="{stage}",model="{model}",kind="{kind}"}} {n}')
+
+            lines += [f"# HELP {p}_llm_cost_usd_total Estimated LLM spend by stage and model",
+                      f"# TYPE {p}_llm_cost_usd_total counter"]
+            for (stage, model), cost in sorted(self._cost.items()):
+                lines.append(f'{p}_llm_cost_usd_total{{stage="{stage}",model="{model}"}} {cost:.6f}')
+
+            lines += [f"# HELP {p}_llm_latency_seconds LLM call latency by stage and model",
+                      f"# TYPE {p}_llm_latency_seconds histogram"]
+            for (stage, model), buckets in sorted(self._latency_buckets.items()):
+                labels = f'stage="{stage}",model="{model}"'
+                for bound, n in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'{p}_llm_latency_seconds_bucket{{{labels},le="{bound}"}} {n}')
+                count = self._latency_count[(stage, model)]
+                lines.append(f'{p}_llm_latency_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{p}_llm_latency_seconds_sum{{{labels}}} {self._latency_sum[(stage, model)]:.6f}')
+                lines.append(f'{p}_llm_latency_seconds_count{{{labels}}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def render_gauges(prefix: str, stats: Dict[str, dict]) -> str:
+    """Flattens {"component": {"key": number}} stats into Prometheus gauges."""
+    lines = []
+    for component, values in stats.items():
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{prefix}_{component}_{key} {value}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+metrics = LLMMetrics(
+    prefix=os.getenv("METRICS_PREFIX", "babycare"),
+    log_sample_rate=float(os.getenv("LLM_LOG_SAMPLE_RATE", "0.1")),
+)
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class TokenCache:
+    """
+    Bounded LRU of decoded Firebase ID tokens, keyed by the token's SHA-256
+    so raw tokens are never held in memory. An entry is only served until
+    `margin_seconds` before the token's own `exp`, so a cached token never
+    outlives the one Firebase would accept.
+    """
+
+    def __init__(self, max_size: int = 10000, margin_seconds: float = 60):
+        self.max_size = max_size
+        self.margin_seconds = margin_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.time() >= entry[0]:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, decoded: Dict[str, Any]):
+        expires_at = float(decoded.get("exp", 0)) - self.margin_seconds
+        if expires_at <= time.time():
+            return
+        key = self.key(token)
+        self._entries[key] = (expires_at, decoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedTokenVerifier:
+    """
+    Verifies ID tokens with `verify` (firebase_admin.auth.verify_id_token)
+    on a worker thread, so signature checks and certificate fetches never
+    block the event loop, and serves repeat tokens from a TokenCache.
+    """
+
+    def __init__(self, verify: Callable[[str], Dict[str, Any]], cache: Optional[TokenCache] = None,
+                 run_blocking: Optional[Callable[..., Awaitable[Any]]] = None):
+        self.verify = verify
+        self.cache = cache
+        self.run_blocking = run_blocking or asyncio.to_thread
+
+    async def __call__(self, token: str) -> Dict[str, Any]:
+        if self.cache is not None:
+            decoded = self.cache.get(token)
+            if decoded is not None:
+                return decoded
+        decoded = await self.run_blocking(self.verify, token)
+        if self.cache is not None:
+            self.cache.set(token, decoded)
+        return decoded
+
+    def stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
+
+
+def verifier_from_env(verify: Callable[[str], Dict[str, Any]],
+                      run_blocking: Optional[Callable[..., Awaitable[Any]]] = None) -> CachedTokenVerifier:
+    cache = None
+    if os.getenv("AUTH_TOKEN_CACHE", "true").lower() == "true":
+        cache = TokenCache(
+            max_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+            margin_seconds=float(os.getenv("AUTH_TOKEN_CACHE_MARGIN_SECONDS", "60")),
+        )
+    return CachedTokenVerifier(verify, cache, run_blocking)